@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from zmqer.journal import Journal
+
+STATE = {
+    "queue": {"a": [1, "x=\0"], "c": {"nested": None}},
+    "running": {"d": 4},
+}
+
+
+async def write(path, compact=False) -> Journal:
+    journal = Journal(path)
+    journal.put("queue", "a", [1, "x=\0"])
+    journal.put("queue", "b", 2)
+    journal.put("queue", "c", {"nested": None})
+    journal.delete("queue", "b")
+    journal.put("running", "d", 3)
+    journal.put("running", "d", 4)
+    await journal.commit()
+    if compact:
+        await journal.compact()
+    await journal.close()
+
+    return journal
+
+
+def reopen(path) -> dict:
+    async def state():
+        journal = Journal(path)
+        await journal.close()
+        return journal.state
+
+    return asyncio.run(state())
+
+
+def test_replay(tmp_path):
+    path = tmp_path / "peer.journal"
+    asyncio.run(write(path))
+
+    assert reopen(path) == STATE
+
+
+@pytest.mark.parametrize(
+    "tail",
+    [
+        b"\x01",
+        # A header promising more than was written.
+        Journal.HEADER.pack(100, 0) + b'["put"',
+        # A complete record whose crc doesn't match.
+        Journal.encode(["put", "queue", "e", 5]).replace(b"5", b"6"),
+    ],
+)
+def test_replay_torn_tail(tmp_path, tail):
+    path = tmp_path / "peer.journal"
+    asyncio.run(write(path))
+    size = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(tail)
+
+    assert reopen(path) == STATE
+    # The torn tail is truncated, so later records follow the good ones.
+    assert path.stat().st_size == size
+
+
+def test_append_after_torn_tail(tmp_path):
+    path = tmp_path / "peer.journal"
+    asyncio.run(write(path))
+    with open(path, "ab") as f:
+        f.write(Journal.encode(["put", "queue", "e", 5])[:-3])
+
+    async def append():
+        journal = Journal(path)
+        journal.put("queue", "f", 6)
+        await journal.close()
+
+    asyncio.run(append())
+
+    assert reopen(path) == {
+        "queue": {**STATE["queue"], "f": 6},
+        "running": STATE["running"],
+    }
+
+
+def test_compact(tmp_path):
+    path = tmp_path / "peer.journal"
+    journal = asyncio.run(write(path, compact=True))
+
+    assert journal._records == 3
+    assert reopen(path) == STATE
+
+
+def test_compact_drops_buffered_records(tmp_path):
+    path = tmp_path / "peer.journal"
+
+    async def compact():
+        journal = Journal(path)
+        journal.put("queue", "a", 1)
+        journal.put("queue", "b", 2)
+        journal.delete("queue", "a")
+        # Compacted before the records were committed, the snapshot has them.
+        await journal.compact()
+        await journal.close()
+
+    asyncio.run(compact())
+
+    assert reopen(path) == {"queue": {"b": 2}}
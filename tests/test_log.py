@@ -0,0 +1,45 @@
+import logging
+
+from zmqer.log import LogPipeline
+
+
+class Sink(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.messages = []
+
+    def emit(self, record):
+        self.records.append(record)
+        self.messages.append(self.format(record))
+
+
+class Payload:
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "payload"
+
+
+def test_records_are_formatted_by_the_listener():
+    sink = Sink()
+    pipeline = LogPipeline(sink, sample_rate=0)
+    logger = logging.getLogger("test_log")
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(pipeline.handler)
+
+    payload = Payload()
+    try:
+        logger.debug("Received %s", payload)
+        # Only the listener formats it, with its sink's formatter.
+        assert payload.formatted == 0
+    finally:
+        logger.removeHandler(pipeline.handler)
+        pipeline.stop()
+
+    assert payload.formatted == 1
+    assert sink.records[0].args == (payload,)
+    assert sink.messages[0].endswith(">\tReceived payload")
@@ -0,0 +1,78 @@
+import pytest
+
+from zmqer import packet
+from zmqer.compression import Compression, train_zdict
+
+PAYLOADS = [
+    b"",
+    b"plain",
+    b"a=b=c",
+    b"=",
+    b"\0",
+    b"\0=\0",
+    b"=\0" * 2048,
+    b'{"key": "value=1"}\0' * 100,
+]
+
+# Ids with "=" and NUL bytes in them, packed little endian.
+RELAYS = [None, (0, 3), (0x3D, 1), (0x3D003D003D003D00, 255)]
+
+
+def compressions():
+    return {
+        "none": None,
+        "zlib": Compression("zlib", threshold=0),
+        "zdict": Compression(
+            "zlib", threshold=0, zdict=train_zdict([b'{"key": "value=1"}\0' * 10])
+        ),
+    }
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+@pytest.mark.parametrize("relay", RELAYS)
+@pytest.mark.parametrize("name", ["none", "zlib", "zdict"])
+def test_round_trip(payload, relay, name):
+    compression = compressions()[name]
+    data = packet.encode("TASK", payload, compression, relay)
+
+    assert packet.peek_type(data) == "TASK"
+    assert packet.peek_relay(data) == relay
+    assert packet.decode(data, {"TASK": compression}) == ("TASK", payload, relay)
+
+
+@pytest.mark.parametrize("relay", RELAYS)
+@pytest.mark.parametrize("name", ["zlib", "zdict"])
+def test_flags(relay, name):
+    compression = compressions()[name]
+    data = packet.encode("TASK", b"=\0" * 2048, compression, relay)
+    flags = data[packet.split(data) + 1]
+
+    assert flags & packet.FLAG_COMPRESSED
+    assert bool(flags & packet.FLAG_ZDICT) == (name == "zdict")
+    assert bool(flags & packet.FLAG_RELAY) == (relay is not None)
+
+
+def test_raw_when_not_compressed():
+    # Too short to be worth compressing, and nothing to relay.
+    data = packet.encode("TASK", b"a=\0", Compression("zlib"))
+
+    assert data == b"TASK=a=\0"
+    assert packet.decode(data) == ("TASK", b"a=\0", None)
+
+
+def test_missing_zdict():
+    data = packet.encode("TASK", b"=\0" * 2048, compressions()["zdict"])
+
+    with pytest.raises(ValueError):
+        packet.decode(data)
+    with pytest.raises(ValueError):
+        packet.decode(data, {"TASK": Compression("zlib", threshold=0)})
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_with_hops(payload):
+    data = packet.encode("GROUP", payload, relay=(0x3D003D, 5))
+    relayed = packet.with_hops(data, 4)
+
+    assert packet.peek_relay(relayed) == (0x3D003D, 4)
+    assert packet.decode(relayed) == ("GROUP", payload, (0x3D003D, 4))
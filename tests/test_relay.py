@@ -0,0 +1,72 @@
+import asyncio
+import collections
+import time
+
+import pytest
+
+from zmqer.misc import SeenCache, find_addresses
+from zmqer.peer import Peer
+
+
+def test_seen_cache():
+    seen = SeenCache(ttl=0.05)
+
+    assert not seen.seen(1)
+    assert seen.seen(1)
+    assert 1 in seen and 2 not in seen
+
+    # Rotated out after between ttl and 2 * ttl.
+    time.sleep(0.06)
+    assert seen.seen(1)
+    time.sleep(0.06)
+    assert not seen.seen(2)
+    assert 1 not in seen
+
+
+class Node(Peer):
+    async def broadcast_loop(self):
+        pass
+
+
+async def ring(n, received, relay_ttl):
+    """`n` peers, each subscribed to the next one only"""
+    addresses = find_addresses(n, 7000, offsets=(0, 20000))
+    nodes = [
+        Node(address, log_level=None, relay_ttl=relay_ttl) for address in addresses
+    ]
+
+    async def PING_handler(peer, message):
+        received[peer.address].append(message)
+
+    for node in nodes:
+        node.register_message_type("PING", PING_handler)
+        node.setup()
+
+    for node, next in zip(nodes, nodes[1:] + nodes[:1]):
+        for name, sub_socket in node.sub_sockets.items():
+            sub_socket.connect(node.channel_address(next.address, name))
+
+    await asyncio.sleep(0.3)
+    return nodes
+
+
+@pytest.mark.parametrize("relay_ttl", [0, 1, 5])
+def test_ring(relay_ttl):
+    received = collections.defaultdict(list)
+
+    async def main():
+        nodes = await ring(5, received, relay_ttl)
+        await nodes[0].broadcast("PING", "hello")
+        await asyncio.sleep(0.3)
+
+        for node in nodes:
+            await node.teardown()
+
+        return [node.address for node in nodes]
+
+    addresses = asyncio.run(main())
+
+    # Besides the sender itself, only its subscriber gets it without relaying, and
+    # each hop reaches one more peer, against the direction of the ring.
+    reached = addresses[:1] + addresses[::-1][: max(relay_ttl, 1)]
+    assert dict(received) == {address: ["hello"] for address in reached}
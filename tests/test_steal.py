@@ -0,0 +1,158 @@
+import asyncio
+import collections
+import json
+import time
+
+from zmqer.peer import TaskablePeer
+from zmqer.task import Task
+
+CLIENT = "tcp://127.0.0.1:1"
+
+
+class Wire:
+    """Carries direct messages between peers in memory, delivered on demand"""
+
+    def __init__(self, *peers):
+        self.peers = {peer.address: peer for peer in peers}
+        self.messages = collections.deque()
+        for peer in peers:
+            peer.send_direct = self.sender(peer)
+
+    def sender(self, peer):
+        async def send_direct(address, type, message, wait=0.0):
+            if address not in self.peers:
+                # e.g. results for the client, which isn't simulated.
+                return address == CLIENT
+            self.messages.append((address, peer.encode_packet(type, message)))
+            return True
+
+        return send_direct
+
+    async def deliver(self, n=1):
+        for _ in range(n):
+            address, message = self.messages.popleft()
+            await self.peers[address].message_type_handler(message)
+
+
+def peers(runs, block=0.0):
+    """A victim with 1 slot whose ability blocks the loop for `block` seconds, and
+    an idle thief, both recording the tasks they ran in `runs`"""
+
+    def work(peer, task):
+        runs[task.id].append(peer.address)
+        if peer.address == "tcp://127.0.0.1:2":
+            time.sleep(block)
+
+    victim, thief = (
+        TaskablePeer(
+            f"tcp://127.0.0.1:{port}",
+            log_level=None,
+            max_inflight=1,
+            steal_interval=None,
+        )
+        for port in (2, 3)
+    )
+    for peer in (victim, thief):
+        peer.register_ability("work", work)
+
+    return victim, thief
+
+
+async def settle(*peers):
+    while any(peer.backlog or peer.inflight or peer.outbox for peer in peers):
+        await asyncio.sleep(0.01)
+
+
+async def steal(victim, thief, wire, tasks):
+    victim.run_batch(tasks)
+    await thief.send_direct(victim.address, "STEAL", json.dumps([thief.address, 1]))
+    # STEAL, GRANT
+    await wire.deliver(2)
+
+
+def batch(n, priority):
+    return [Task(CLIENT, "work", {"n": i}, priority) for i in range(n)]
+
+
+def test_steal():
+    runs = collections.defaultdict(list)
+
+    async def main():
+        victim, thief = peers(runs)
+        wire = Wire(victim, thief)
+        tasks = batch(4, victim.address)
+
+        await steal(victim, thief, wire, tasks)
+        # ACCEPT, COMMIT
+        await wire.deliver(2)
+        await settle(victim, thief)
+
+        assert not victim.granted and not thief.offered
+        for peer in (victim, thief):
+            await peer.teardown()
+
+        return tasks
+
+    tasks = asyncio.run(main())
+
+    assert sorted(runs) == sorted(task.id for task in tasks)
+    assert all(len(ran) == 1 for ran in runs.values())
+    assert collections.Counter(ran[0] for ran in runs.values()) == {
+        "tcp://127.0.0.1:2": 3,
+        "tcp://127.0.0.1:3": 1,
+    }
+
+
+def test_steal_from_blocked_victim(monkeypatch):
+    """The victim reclaims its grant before it reads the thief's ACCEPT"""
+    monkeypatch.setattr(TaskablePeer, "GRANT_TIMEOUT", 0.05)
+    runs = collections.defaultdict(list)
+
+    async def main():
+        victim, thief = peers(runs, block=0.2)
+        wire = Wire(victim, thief)
+        tasks = batch(4, victim.address)
+
+        await steal(victim, thief, wire, tasks)
+        # The victim is blocked past GRANT_TIMEOUT before the ACCEPT is read.
+        await asyncio.sleep(0.3)
+        # ACCEPT, COMMIT
+        await wire.deliver(2)
+        await settle(victim, thief)
+
+        assert not victim.granted and not thief.offered
+        for peer in (victim, thief):
+            await peer.teardown()
+
+        return tasks
+
+    tasks = asyncio.run(main())
+
+    assert sorted(runs) == sorted(task.id for task in tasks)
+    assert all(ran == ["tcp://127.0.0.1:2"] for ran in runs.values())
+
+
+def test_commit_lost():
+    """The victim runs committed tasks itself if the COMMIT can't be sent"""
+    runs = collections.defaultdict(list)
+
+    async def main():
+        victim, thief = peers(runs)
+        wire = Wire(victim, thief)
+        tasks = batch(4, victim.address)
+
+        await steal(victim, thief, wire, tasks)
+        wire.peers.pop(thief.address)
+        # ACCEPT
+        await wire.deliver(1)
+        await settle(victim, thief)
+
+        for peer in (victim, thief):
+            await peer.teardown()
+
+        return tasks
+
+    tasks = asyncio.run(main())
+
+    assert sorted(runs) == sorted(task.id for task in tasks)
+    assert all(ran == ["tcp://127.0.0.1:2"] for ran in runs.values())
@@ -0,0 +1,31 @@
+import asyncio
+
+from zmqer.misc import find_addresses
+from zmqer.peer import TaskablePeer
+
+
+def echo(peer, task):
+    return task.payload["n"]
+
+
+def test_submit_without_subclassing():
+    async def main():
+        (address,) = find_addresses(1, 7100, offsets=(0, 10000, 20000))
+        peer = TaskablePeer(address, log_level=None, steal_interval=None)
+        peer.register_ability("echo", echo)
+        # Nothing to send, and no generated workload.
+        assert peer.submit_many("echo", []) == []
+        await peer.broadcast_loop()
+
+        # Tasks for ourselves are broadcast, we get them back on our own loopback.
+        peer.setup()
+        await asyncio.sleep(0.1)
+        payloads = [{"n": n} for n in range(3)]
+        tasks = await asyncio.gather(
+            *peer.submit_many("echo", payloads, priority=address, timeout=5.0)
+        )
+        await peer.teardown()
+
+        return [task.results for task in tasks]
+
+    assert asyncio.run(main()) == [0, 1, 2]
@@ -0,0 +1,67 @@
+import pytest
+
+from zmqer.task import Task, TaskStatus
+
+
+def fields(task: Task) -> tuple:
+    return tuple(getattr(task, name) for name in Task.__slots__)
+
+
+@pytest.mark.parametrize("status", list(TaskStatus))
+def test_batch_round_trip_status(status):
+    task = Task(
+        "tcp://127.0.0.1:5555",
+        "print_ability",
+        {"a": 1, "b": [2, 3]},
+        priority="tcp://127.0.0.1:5556",
+        status=status,
+        results=None if status < TaskStatus.COMPLETE else {"result": 6},
+    )
+
+    (decoded,) = Task.decode_batch(Task.encode_batch([task]))
+
+    assert fields(decoded) == fields(task)
+    assert decoded.status is status
+
+
+def test_batch_round_trip_no_priority():
+    task = Task("tcp://127.0.0.1:5555", "print_ability", {"a": 1})
+
+    (decoded,) = Task.decode_batch(Task.encode_batch([task]))
+
+    assert decoded.priority is None
+    assert fields(decoded) == fields(task)
+
+
+def test_batch_round_trip_empty_body():
+    task = Task("tcp://127.0.0.1:5555")
+
+    (decoded,) = Task.decode_batch(Task.encode_batch([task]))
+
+    assert decoded.todo is None
+    assert decoded.payload == {}
+    assert decoded.results is None
+    assert fields(decoded) == fields(task)
+
+
+def test_batch_round_trip_many():
+    tasks = [
+        Task("tcp://127.0.0.1:5555"),
+        Task(
+            "tcp://127.0.0.1:5556",
+            "fetch",
+            {"url": "http://example.com/?q=é"},
+            priority="tcp://127.0.0.1:5555",
+            status=TaskStatus.FAILED,
+            results="timed out",
+        ),
+        Task("tcp://127.0.0.1:5557", "print_ability", results=0),
+    ]
+
+    decoded = Task.decode_batch(Task.encode_batch(tasks))
+
+    assert [fields(task) for task in decoded] == [fields(task) for task in tasks]
+
+
+def test_decode_empty_batch():
+    assert Task.decode_batch(Task.encode_batch([])) == []
@@ -10,7 +10,9 @@ import uuid
 import logging
 import os
 
+from zmqer.channel import BULK, DEFAULT_CHANNELS
 from zmqer.peer import TaskablePeer
+from zmqer.task import Task
 from zmqer.misc import connect_all
 
 
@@ -102,31 +104,71 @@ class Transaction:
     recipient: str = None
     providers: list[str] = None
 
+    def to_record(self) -> dict[str, Any]:
+        """A JSON-serializable record of the transaction for the peer's journal."""
+        return {
+            "ID": self.ID,
+            "status": self.status.name,
+            "package": {"name": self.package.name, "path": str(self.package.path)},
+            "recipient": self.recipient,
+            "providers": self.providers,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict[str, Any]) -> "Transaction":
+        """Restore a transaction from its journal record."""
+        return cls(
+            ID=record["ID"],
+            status=cls.Status[record["status"]],
+            package=Package(**record["package"]),
+            recipient=record["recipient"],
+            providers=record["providers"],
+        )
+
 
 class TorrentialPeer(TaskablePeer):
     def __init__(self, *args, **kwargs):
+        # Package chunks get their own channel so they can't delay group traffic.
+        kwargs.setdefault("channels", {**DEFAULT_CHANNELS, "bulk": BULK})
         super().__init__(*args, **kwargs)
         self.transactions = {}
 
+        if self.journal is not None:
+            self.transactions = {
+                name: Transaction.from_record(record)
+                for name, record in self.journal.get("transactions").items()
+            }
+
+    def journal_transaction(self, transaction: Transaction):
+        """Record the transaction's current state in the journal, if any."""
+        if self.journal is not None:
+            self.journal.put(
+                "transactions", transaction.package.name, transaction.to_record()
+            )
+
     async def start_transaction(self, transaction: Transaction):
         transaction.status = Transaction.Status.transmitting
+        self.journal_transaction(transaction)
         self.logger.info(
-            f"Transaction {transaction.ID} started for package {transaction.package.name}"
+            "Transaction %s started for package %s",
+            transaction.ID,
+            transaction.package.name,
         )
         package_stream = transaction.package.stream_iter()
 
         for chunk in package_stream:
-            packet = f"{transaction.package.name}={chunk}"
-            await self.pub_socket.send_string(packet)
-            self.logger.debug(f"{self.address}:\n\tSent message: {packet}")
+            await self.broadcast(transaction.package.name, chunk, channel="bulk")
 
         transaction.status = Transaction.Status.complete
+        self.journal_transaction(transaction)
         self.logger.info(
-            f"Transaction {transaction.ID} completed for package {transaction.package.name}"
+            "Transaction %s completed for package %s",
+            transaction.ID,
+            transaction.package.name,
         )
 
-    async def message_type_handler(self, message):
-        package_name, chunk = message.split("=")
+    async def message_type_handler(self, message: bytes):
+        package_name, chunk, _ = self.decode_packet(message)
         if package_name not in self.transactions:
             package = Package(name=package_name, path=Path())
             self.transactions[package_name] = Transaction(
@@ -136,29 +178,38 @@ class TorrentialPeer(TaskablePeer):
                 providers=[self.address],
             )
             self.logger.info(
-                f"New transaction {self.transactions[package_name].ID} created for package {package_name}"
+                "New transaction %s created for package %s",
+                self.transactions[package_name].ID,
+                package_name,
             )
 
         transaction = self.transactions[package_name]
         transaction.status = Transaction.Status.transmitting
         self.logger.info(
-            f"Transaction {transaction.ID} started for package {transaction.package.name}"
+            "Transaction %s started for package %s",
+            transaction.ID,
+            transaction.package.name,
         )
         transaction.package.path.write_bytes(chunk)
 
         if len(transaction.package) >= len(chunk):
             transaction.status = Transaction.Status.complete
             self.logger.info(
-                f"Transaction {transaction.ID} completed for package {transaction.package.name}"
+                "Transaction %s completed for package %s",
+                transaction.ID,
+                transaction.package.name,
             )
         else:
             transaction.status = Transaction.Status.pending
             self.logger.info(
-                f"Transaction {transaction.ID} still pending for package {transaction.package.name}"
+                "Transaction %s still pending for package %s",
+                transaction.ID,
+                transaction.package.name,
             )
+        self.journal_transaction(transaction)
 
-    def handle_completed_task(self, data: dict[str, Any]):
-        print(f"Completed task, results: {data=}")
+    def handle_completed_task(self, task: Task):
+        print(f"Completed task, results: {task=} {task.results=}")
 
 
 def main():
@@ -1,13 +1,46 @@
 import asyncio
 import logging
 import shutil
+import signal
 import os
 
+import zmqer.log
 from zmqer.argparser import argparser
-from zmqer.misc import connect_linked
+from zmqer.channel import DEFAULT_CHANNELS
+from zmqer.compression import Compression
+from zmqer.monitor import start_profile
+from zmqer.misc import find_addresses
 
+from zmqer.peer.group import DIRECT_PORT_OFFSET
 from zmqer.peer.random import RandomTaskablePeer as Peer
 
+# Every port a peer binds, relative to its address.
+PORT_OFFSETS = (
+    *(channel.port_offset for channel in DEFAULT_CHANNELS.values()),
+    DIRECT_PORT_OFFSET,
+)
+
+
+def peer_path(directory, address, extension):
+    """A per peer file in `directory`, named after the peer's port"""
+    if directory is None:
+        return None
+    return os.path.join(directory, f"{address.rsplit(':', 1)[1]}.{extension}")
+
+
+async def start_peer(peer, seed, delay=0.0):
+    if delay:
+        peer.logger.debug("Delaying peer setup")
+        await asyncio.sleep(delay)
+
+    tasks = peer.setup()
+    # Fetch the group (and pending tasks) from the seed instead of waiting for
+    # GROUP broadcasts to reach us.
+    if peer is not seed:
+        await peer.bootstrap(seed.address)
+
+    await asyncio.gather(*tasks)
+
 
 async def teardown_peers(peers):
     # Use gather to teardown all peers concurrently
@@ -18,62 +51,55 @@ def main():
     args = argparser()
     # setup logging
     logging.basicConfig(level=args.log_level)
+    zmqer.log.configure(sample_rate=args.log_sample_rate)
 
-    #   reset logs - if using file handlers
+    #   reset logs - all peers share a single rotating log file
     if args.log_to == "file":
         if os.path.exists("logs"):
             shutil.rmtree("logs")
         os.makedirs("logs")
 
-    # Instantiate peers for a random port range from starting_port to starting_port+n_peers.
+    compression = None
+    if args.compression is not None:
+        codec = Compression(args.compression, threshold=args.compression_threshold)
+        compression = {"TASK": codec, "GROUP": codec}
+
+    # Instantiate peers from starting_port up, skipping ports that are taken.
+    addresses = find_addresses(args.n_peers, args.starting_port, PORT_OFFSETS)
 
-    #   Log first peer to stdout
+    #   Log first peer to stdout, the rest only with --log-all
     peers = [
-        Peer(
-            f"tcp://127.0.0.1:{args.starting_port}",
-            log_to=args.log_to,
-            log_level=args.log_level,
-        )
-    ]
-    #    Initialize the rest of the peers
-    peers += [
         Peer(
             address,
-            log_to=args.log_to if args.log_all else None,
+            log_to=args.log_to if i == 0 or args.log_all else None,
             log_level=args.log_level,
+            journal_path=peer_path(args.journal_dir, address, "journal"),
+            trace_path=peer_path(args.trace_dir, address, "trace"),
+            compression=compression,
+            relay_ttl=args.relay_ttl,
         )
-        for address in [
-            f"tcp://127.0.0.1:{port}"
-            for port in range(
-                args.starting_port + len(peers), args.starting_port + args.n_peers
-            )
-        ]
+        for i, address in enumerate(addresses)
     ]
 
-    connect_linked(peers)
-
-    coroutines = set()
-    # Create a set of tasks
-    for i, peer in enumerate(peers):
-        if i <= int(args.n_peers * args.n_late_start_peers):
-            peer.logger.debug("Delaying peer setup")
-
-            async def delay_wrapper(task):
-                await asyncio.sleep(args.peer_setup_delay)
-                peer.logger.debug(
-                    f"Running delayed peer.setup() task: {task.__class__.__name__}..."
-                )
-                await task
-
-            for task in peer.setup():
-                coroutines.add(delay_wrapper(task))
-        else:
-            coroutines.update(peer.setup())
+    # Late-start peers come first, so the last peer always starts right away and
+    # every other peer bootstraps from it.
+    seed = peers[-1]
+    n_late = int(args.n_peers * args.n_late_start_peers)
+    coroutines = [
+        start_peer(peer, seed, args.peer_setup_delay if i <= n_late else 0.0)
+        for i, peer in enumerate(peers)
+    ]
 
     try:
         # event loop
         loop = asyncio.get_event_loop()
 
+        #   kill -USR1 <pid> profiles the running process
+        if hasattr(signal, "SIGUSR1"):
+            loop.add_signal_handler(
+                signal.SIGUSR1, start_profile, args.profile_seconds, loop
+            )
+
         fut = asyncio.gather(*coroutines)
         loop.run_until_complete(fut)
     except KeyboardInterrupt:
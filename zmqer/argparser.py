@@ -1,6 +1,8 @@
 import argparse
 from random import randint
 
+from zmqer.compression import CODECS
+
 
 def argparser():
     parser = argparse.ArgumentParser()
@@ -27,6 +29,13 @@ def argparser():
         action="store_true",
         help="Log all messages, not just those from specified logging peers.",
     )
+    parser.add_argument(
+        "-lsr",
+        "--log-sample-rate",
+        type=float,
+        default=10.0,
+        help="Max DEBUG records per second from each logging call site. (0 disables sampling)",
+    )
 
     # peer setup
     parser.add_argument(
@@ -55,7 +64,51 @@ def argparser():
         "--starting-port",
         type=int,
         default=5555 + randint(0, 1000),
-        help="Starting port for peer addresses. (defaults to 5555+randint(1000))",
+        help="Starting port for peer addresses, taken ports are skipped. (defaults to 5555+randint(1000))",
+    )
+
+    parser.add_argument(
+        "-c",
+        "--compression",
+        type=str,
+        default=None,
+        choices=list(CODECS),
+        help="Codec used to compress large TASK and GROUP messages.",
+    )
+    parser.add_argument(
+        "-ct",
+        "--compression-threshold",
+        type=int,
+        default=1024,
+        help="Only compress messages of at least this many bytes.",
+    )
+    parser.add_argument(
+        "-rt",
+        "--relay-ttl",
+        type=int,
+        default=0,
+        help="Relay broadcasts for up to this many hops, for sparse topologies. (0 disables relaying)",
+    )
+    parser.add_argument(
+        "-ps",
+        "--profile-seconds",
+        type=float,
+        default=10.0,
+        help="How long to profile for on SIGUSR1, reports go to profiles/.",
+    )
+    parser.add_argument(
+        "-jd",
+        "--journal-dir",
+        type=str,
+        default=None,
+        help="Directory to journal each peer's tasks in, so they survive a restart.",
+    )
+    parser.add_argument(
+        "-td",
+        "--trace-dir",
+        type=str,
+        default=None,
+        help="Directory to trace each peer's packets to, see python -m zmqer.replay.",
     )
 
     args = parser.parse_args()
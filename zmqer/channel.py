@@ -0,0 +1,28 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Channel:
+    """A PUB/SUB socket pair carrying some of a peer's message types.
+
+    A channel binds at the peer's port + `port_offset`, so each one gets its own
+    connections and queues (of `hwm` messages) and can't be held up by another.
+    When several channels have messages waiting, the receive loop serves them by
+    descending `weight`, taking up to `weight` messages from each per round.
+    Messages sent direct (see GroupPeer.send_direct) don't go through channels and
+    are not prioritized.
+    """
+
+    port_offset: int = 0
+    hwm: int = 1000
+    weight: int = 1
+
+
+# Membership and other small control messages share the peer's own address.
+CONTROL = Channel(port_offset=0, weight=16)
+DATA = Channel(port_offset=20000, weight=4)
+# Large transfers, e.g. TorrentialPeer package chunks. PUB sockets drop messages
+# past their HWM, so a smaller one would lose the chunks of larger packages.
+BULK = Channel(port_offset=30000, weight=1)
+
+DEFAULT_CHANNELS = {"control": CONTROL, "data": DATA}
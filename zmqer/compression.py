@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+import lzma
+from typing import Callable
+import zlib
+
+# Optional faster codecs
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+
+@dataclass
+class Codec:
+    id: int
+    compress: Callable[[bytes, bytes | None], bytes]
+    decompress: Callable[[bytes, bytes | None], bytes]
+    supports_zdict: bool = False
+
+
+def _zlib_compress(data, zdict):
+    if zdict is None:
+        return zlib.compress(data)
+    c = zlib.compressobj(zdict=zdict)
+    return c.compress(data) + c.flush()
+
+
+def _zlib_decompress(data, zdict):
+    if zdict is None:
+        return zlib.decompress(data)
+    d = zlib.decompressobj(zdict=zdict)
+    return d.decompress(data) + d.flush()
+
+
+CODECS = {
+    "zlib": Codec(1, _zlib_compress, _zlib_decompress, supports_zdict=True),
+    "lzma": Codec(
+        2, lambda data, _: lzma.compress(data), lambda data, _: lzma.decompress(data)
+    ),
+}
+
+if zstandard is not None:
+
+    def _zstd_compress(data, zdict):
+        dict_data = zstandard.ZstdCompressionDict(zdict) if zdict else None
+        return zstandard.ZstdCompressor(dict_data=dict_data).compress(data)
+
+    def _zstd_decompress(data, zdict):
+        dict_data = zstandard.ZstdCompressionDict(zdict) if zdict else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+
+    CODECS["zstd"] = Codec(3, _zstd_compress, _zstd_decompress, supports_zdict=True)
+
+if lz4 is not None:
+    CODECS["lz4"] = Codec(
+        4,
+        lambda data, _: lz4.frame.compress(data),
+        lambda data, _: lz4.frame.decompress(data),
+    )
+
+CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+
+
+class Compression:
+    """Compression settings for one message type.
+
+    Payloads shorter than `threshold` bytes, or that don't shrink, are sent as is.
+    A `zdict` (see train_zdict) must be configured the same on every peer.
+    """
+
+    def __init__(self, codec="zlib", threshold=1024, zdict: bytes | None = None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec}, available: {list(CODECS)}")
+
+        self.codec = CODECS[codec]
+        self.threshold = threshold
+        self.zdict = zdict if self.codec.supports_zdict else None
+
+    def compress(self, payload: bytes) -> bytes | None:
+        """Compress the payload, or return None if it's not worth it"""
+        if len(payload) < self.threshold:
+            return None
+
+        compressed = self.codec.compress(payload, self.zdict)
+        if len(compressed) + 2 >= len(payload):
+            return None
+
+        return compressed
+
+
+def decompress(data: bytes, codec_id: int, zdict: bytes | None = None) -> bytes:
+    """Decompress data produced by Compression.compress"""
+    return CODECS_BY_ID[codec_id].decompress(data, zdict)
+
+
+def train_zdict(samples: list[bytes], size=16 * 1024) -> bytes:
+    """Build a shared dictionary from typical payloads.
+
+    Uses zstd's trainer when available, otherwise the most recent samples, which is
+    what zlib wants: common content, with the most likely at the end.
+    """
+    if zstandard is not None:
+        try:
+            return zstandard.train_dictionary(size, samples).as_bytes()
+        except zstandard.ZstdError:
+            pass
+
+    return b"".join(samples)[-size:]
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+import os
+from pathlib import Path
+import struct
+from typing import Any
+import zlib
+
+logger = logging.getLogger(__name__)
+
+
+class Journal:
+    """An append-only log of put/delete records, replayed into `state` on open.
+
+    Records are buffered in memory and written by `commit` in batches, so many
+    records share one fsync (group commit). Once the log holds `compact_ratio`
+    times more records than there are live entries it is rewritten as a snapshot
+    of the live state.
+    """
+
+    # record length, crc32 of the record
+    HEADER = struct.Struct("<II")
+
+    def __init__(
+        self, path, commit_interval=0.005, compact_ratio=4, compact_min_records=1024
+    ):
+        self.path = Path(path)
+        self.commit_interval = commit_interval
+        self.compact_ratio = compact_ratio
+        self.compact_min_records = compact_min_records
+
+        self.state: dict[str, dict[str, Any]] = {}
+        self._buffer: list[bytes] = []
+        self._records = 0
+        self._lock = asyncio.Lock()
+        # Set while there are buffered records, see commit_loop.
+        self._pending = asyncio.Event()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.replay()
+        self._file = open(self.path, "ab")
+
+    @classmethod
+    def encode(cls, record: list) -> bytes:
+        payload = json.dumps(record, separators=(",", ":")).encode()
+        return cls.HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def replay(self):
+        """Rebuild `state` from the log, truncating a torn tail if there is one"""
+        if not self.path.exists():
+            return
+
+        data = self.path.read_bytes()
+        offset = 0
+        while offset + self.HEADER.size <= len(data):
+            length, crc = self.HEADER.unpack_from(data, offset)
+            start = offset + self.HEADER.size
+            payload = data[start : start + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+
+            self._apply(json.loads(payload))
+            self._records += 1
+            offset = start + length
+
+        if offset < len(data):
+            logger.warning(
+                "%s: dropping %d bytes of torn records", self.path, len(data) - offset
+            )
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+    def _apply(self, record: list):
+        op, kind, key, value = record
+        if op == "put":
+            self.state.setdefault(kind, {})[key] = value
+        else:
+            self.state.get(kind, {}).pop(key, None)
+
+    def get(self, kind: str) -> dict[str, Any]:
+        return self.state.get(kind, {})
+
+    def put(self, kind: str, key: str, value: Any):
+        """Record `value` under `key`, durable after the next commit"""
+        record = ["put", kind, key, value]
+        self._apply(record)
+        self._buffer.append(self.encode(record))
+        self._pending.set()
+
+    def delete(self, kind: str, key: str):
+        """Record the removal of `key`, durable after the next commit"""
+        if key not in self.state.get(kind, {}):
+            return
+
+        record = ["del", kind, key, None]
+        self._apply(record)
+        self._buffer.append(self.encode(record))
+        self._pending.set()
+
+    def _write(self, data: bytes):
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _rewrite(self, data: bytes):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._file.close()
+        os.replace(tmp, self.path)
+        self._file = open(self.path, "ab")
+
+    async def commit(self):
+        """Write and fsync every buffered record in one go"""
+        async with self._lock:
+            if self._buffer:
+                batch, self._buffer = self._buffer, []
+                await asyncio.to_thread(self._write, b"".join(batch))
+                self._records += len(batch)
+
+            live = sum(len(entries) for entries in self.state.values())
+            if (
+                self._records > self.compact_min_records
+                and self._records > self.compact_ratio * live
+            ):
+                await self.compact()
+
+    async def compact(self):
+        """Replace the log with a snapshot of the live state"""
+        snapshot = [
+            self.encode(["put", kind, key, value])
+            for kind, entries in self.state.items()
+            for key, value in entries.items()
+        ]
+        # Anything buffered is already part of the snapshot.
+        self._buffer = []
+
+        await asyncio.to_thread(self._rewrite, b"".join(snapshot))
+        self._records = len(snapshot)
+        logger.debug("%s: compacted to %d records", self.path, self._records)
+
+    async def commit_loop(self):
+        """Commit whenever there are records, `commit_interval` after the first one
+        so the ones that follow share its commit
+        """
+        while True:
+            await self._pending.wait()
+            await asyncio.sleep(self.commit_interval)
+            self._pending.clear()
+            try:
+                await self.commit()
+            except Exception as e:
+                logger.error("%s: Error: %s", self.path, e)
+
+    async def close(self):
+        await self.commit()
+        self._file.close()
@@ -0,0 +1,110 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import time
+
+LOG_DIR = "logs"
+LOG_FORMAT = "%(filename)s:%(lineno)d>\t%(message)s"
+
+
+class SamplingFilter(logging.Filter):
+    """Rate limit DEBUG records per call site.
+
+    Records are keyed on the source line that logged them, so every call site gets
+    one token bucket of `rate` records per second (bursting up to `burst`), shared
+    by all the peers' loggers.
+    Records above DEBUG are never dropped.
+    """
+
+    def __init__(self, rate=10.0, burst=None):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self._buckets = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or not self.rate:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+        if tokens < 1.0:
+            self._buckets[key] = (tokens, now)
+            return False
+
+        self._buckets[key] = (tokens - 1.0, now)
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """A QueueHandler that leaves formatting to the listener thread.
+
+    The stock one formats every record on the emitting thread, so that it can be
+    pickled, but our queue never leaves the process.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class LogPipeline:
+    """A QueueHandler feeding a single shared sink drained by a listener thread."""
+
+    def __init__(self, sink: logging.Handler, sample_rate=10.0):
+        sink.setFormatter(logging.Formatter(LOG_FORMAT))
+
+        self.queue = queue.SimpleQueue()
+        self.handler = LazyQueueHandler(self.queue)
+        self.handler.addFilter(SamplingFilter(sample_rate))
+        self.listener = logging.handlers.QueueListener(
+            self.queue, sink, respect_handler_level=True
+        )
+        self.listener.start()
+
+    def stop(self):
+        self.listener.stop()
+
+
+_pipelines = {}
+_sample_rate = 10.0
+
+
+def configure(sample_rate=10.0):
+    """Set the debug sampling rate (records/s per call site, 0 disables sampling)"""
+    global _sample_rate
+    _sample_rate = sample_rate
+
+    for pipeline in _pipelines.values():
+        for f in pipeline.handler.filters:
+            if isinstance(f, SamplingFilter):
+                f.rate = f.burst = sample_rate
+
+
+def get_handler(log_to) -> logging.Handler | None:
+    """Return the process-wide queue handler for `log_to`, creating its sink once."""
+    if log_to not in ("file", "stdout"):
+        return None
+
+    if log_to not in _pipelines:
+        if log_to == "file":
+            sink = logging.handlers.RotatingFileHandler(
+                f"{LOG_DIR}/zmqer.log", maxBytes=10 * 1024 * 1024, backupCount=5
+            )
+        else:
+            sink = logging.StreamHandler()
+
+        _pipelines[log_to] = LogPipeline(sink, sample_rate=_sample_rate)
+
+    return _pipelines[log_to].handler
+
+
+@atexit.register
+def shutdown():
+    """Flush and stop all listener threads"""
+    while _pipelines:
+        _, pipeline = _pipelines.popitem()
+        pipeline.stop()
@@ -1,5 +1,7 @@
 from itertools import combinations
 from random import random
+import socket
+import time
 
 
 def call_super():
@@ -15,6 +17,72 @@ def call_super():
     return decorator
 
 
+class SeenCache:
+    """Remembers ids for between `ttl` and 2 * `ttl` seconds.
+
+    Ids go into time buckets, the oldest bucket is dropped as a whole every `ttl`.
+    """
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._current = set()
+        self._previous = set()
+        self._rotated = time.monotonic()
+
+    def seen(self, id) -> bool:
+        """Add `id`, returning whether it was already there"""
+        now = time.monotonic()
+        if now - self._rotated > self.ttl:
+            stale = now - self._rotated > 2 * self.ttl
+            self._previous = set() if stale else self._current
+            self._current = set()
+            self._rotated = now
+
+        if id in self._current or id in self._previous:
+            return True
+
+        self._current.add(id)
+        return False
+
+    def __contains__(self, id) -> bool:
+        return id in self._current or id in self._previous
+
+    def __len__(self):
+        return len(self._current) + len(self._previous)
+
+
+# Address helpers
+
+
+def port_free(host: str, port: int) -> bool:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        try:
+            s.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+
+def find_addresses(n, starting_port, offsets=(0,), host="127.0.0.1") -> list[str]:
+    """Find `n` addresses from `starting_port` up whose ports + `offsets` are free.
+
+    Ports that are taken, at any of the offsets, are skipped rather than failing
+    the peer's setup later on.
+    """
+    addresses = []
+    port = starting_port
+    last_port = 65535 - max(offsets)
+    while len(addresses) < n:
+        if port > last_port:
+            raise OSError(f"Ran out of free ports for {n} peers from {starting_port}")
+
+        if all(port_free(host, port + offset) for offset in offsets):
+            addresses.append(f"tcp://{host}:{port}")
+        port += 1
+
+    return addresses
+
+
 # Connect helpers
 
 
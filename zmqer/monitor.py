@@ -0,0 +1,177 @@
+import asyncio
+import collections
+import contextlib
+import cProfile
+import io
+import logging
+import os
+from pathlib import Path
+import pstats
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = "profiles"
+
+
+class _Timed:
+    """Awaits an awaitable, timing each of its steps with `monitor.record`"""
+
+    __slots__ = ("awaitable", "monitor", "label")
+
+    def __init__(self, awaitable, monitor, label):
+        self.awaitable = awaitable
+        self.monitor = monitor
+        self.label = label
+
+    def __await__(self):
+        steps = self.awaitable.__await__()
+        value, error = None, None
+        while True:
+            start = time.perf_counter()
+            try:
+                if error is None:
+                    future = steps.send(value)
+                else:
+                    future = steps.throw(error)
+            except StopIteration as e:
+                return e.value
+            finally:
+                self.monitor.record(time.perf_counter() - start, self.label)
+
+            try:
+                value, error = (yield future), None
+            except GeneratorExit:
+                steps.close()
+                raise
+            except BaseException as e:
+                value, error = None, e
+
+
+class LoopMonitor:
+    """Per process event loop lag probe and slow handler detection.
+
+    Handlers and abilities run inside `track` (plain calls) or `timed` (awaitables,
+    only the steps in between suspensions count), which warn about sections that
+    blocked the loop for longer than `slow_threshold`. When the probe wakes up more
+    than `lag_threshold` late, the stall is blamed on the longest such section since
+    its last tick, the one that kept the loop from running it.
+    """
+
+    def __init__(self, interval=0.1, lag_threshold=0.1, slow_threshold=0.05):
+        self.interval = interval
+        self.lag_threshold = lag_threshold
+        self.slow_threshold = slow_threshold
+
+        self.lag = 0.0
+        self.max_lag = 0.0
+        # label -> number of slow runs / stalls blamed on it
+        self.slow = collections.Counter()
+        self.stalls = collections.Counter()
+
+        self._slowest = (0.0, None)
+        self._probe = None
+        self._users = 0
+
+    def record(self, elapsed: float, label: tuple):
+        """Account for `elapsed` seconds `label` spent blocking the loop"""
+        if elapsed > self._slowest[0]:
+            self._slowest = (elapsed, label)
+        if elapsed > self.slow_threshold:
+            self.slow[label] += 1
+            logger.warning("Slow %s blocked for %.3fs", "/".join(label), elapsed)
+
+    @contextlib.contextmanager
+    def track(self, *label):
+        """Time a synchronous section"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start, label)
+
+    def timed(self, awaitable, *label):
+        """Wrap an awaitable, timing the steps it runs but not its suspensions"""
+        return _Timed(awaitable, self, label)
+
+    async def probe(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - start - self.interval)
+            self.max_lag = max(self.max_lag, self.lag)
+
+            elapsed, label = self._slowest
+            self._slowest = (0.0, None)
+            if self.lag > self.lag_threshold:
+                self.stalls[label] += 1
+                logger.warning(
+                    "Event loop lagged %.3fs, slowest section: %s (%.3fs)",
+                    self.lag,
+                    "/".join(label) if label else "untracked",
+                    elapsed,
+                )
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Start the probe on `loop`, once per process, see stop"""
+        self._users += 1
+        if self._probe is None or self._probe.done():
+            self._probe = loop.create_task(self.probe())
+
+    async def stop(self):
+        """Stop the probe once every user that started it has stopped it"""
+        self._users = max(0, self._users - 1)
+        if self._users or self._probe is None:
+            return
+
+        probe, self._probe = self._probe, None
+        probe.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await probe
+
+
+monitor = LoopMonitor()
+
+_profiling = False
+_profiles = set()
+
+
+async def profile(seconds: float, directory=PROFILE_DIR) -> Path | None:
+    """Profile this process for `seconds`, writing a .prof dump and a text report.
+
+    Returns the path of the dump, or None if a profile is already running.
+    """
+    global _profiling
+    if _profiling:
+        logger.warning("Already profiling, ignoring request")
+        return None
+
+    _profiling = True
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+        _profiling = False
+
+    os.makedirs(directory, exist_ok=True)
+    path = Path(directory) / f"{os.getpid()}-{int(time.time())}.prof"
+    profiler.dump_stats(path)
+
+    report = io.StringIO()
+    stats = pstats.Stats(profiler, stream=report)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(50)
+    path.with_suffix(".txt").write_text(report.getvalue())
+
+    logger.info("Wrote %.1fs profile to %s", seconds, path)
+    return path
+
+
+def start_profile(seconds: float, loop: asyncio.AbstractEventLoop | None = None):
+    """Schedule `profile` without waiting for it, e.g. from a signal handler"""
+    loop = loop or asyncio.get_event_loop()
+    task = loop.create_task(profile(seconds))
+    _profiles.add(task)
+    task.add_done_callback(_profiles.discard)
@@ -0,0 +1,107 @@
+from typing import NamedTuple
+import struct
+
+from zmqer.compression import Compression, decompress
+
+# A packet is TYPE=payload, or TYPE\0 followed by a flags byte, the headers the
+# flags call for and then the payload. Message types never contain a NUL byte.
+RAW = ord("=")
+ENVELOPE = 0
+
+FLAG_COMPRESSED = 0x01
+FLAG_ZDICT = 0x02
+FLAG_RELAY = 0x04
+
+# message id, hops left
+RELAY = struct.Struct("<QB")
+
+
+class Packet(NamedTuple):
+    type: str
+    payload: bytes
+    relay: tuple[int, int] | None = None
+
+
+def encode(
+    type: str,
+    payload: bytes,
+    compression: Compression | None = None,
+    relay: tuple[int, int] | None = None,
+) -> bytes:
+    flags = 0
+    header = b""
+
+    if relay is not None:
+        flags |= FLAG_RELAY
+        header += RELAY.pack(*relay)
+
+    if compression is not None:
+        compressed = compression.compress(payload)
+        if compressed is not None:
+            flags |= FLAG_COMPRESSED
+            if compression.zdict is not None:
+                flags |= FLAG_ZDICT
+            header += bytes((compression.codec.id,))
+            payload = compressed
+
+    if not flags:
+        return type.encode() + b"=" + payload
+
+    return type.encode() + b"\0" + bytes((flags,)) + header + payload
+
+
+def split(packet: bytes) -> int:
+    """The index of the separator after the packet's type"""
+    end = packet.find(b"=")
+    envelope = packet.find(b"\0", 0, end if end >= 0 else len(packet))
+    return envelope if envelope >= 0 else end
+
+
+def peek_type(packet: bytes) -> str:
+    return packet[: split(packet)].decode()
+
+
+def peek_relay(packet: bytes) -> tuple[int, int] | None:
+    """The relay header of a packet, without decoding the rest of it"""
+    sep = split(packet)
+    if packet[sep] == RAW or not packet[sep + 1] & FLAG_RELAY:
+        return None
+
+    return RELAY.unpack_from(packet, sep + 2)
+
+
+def decode(packet: bytes, compressions: dict[str, Compression] | None = None) -> Packet:
+    sep = split(packet)
+    type = packet[:sep].decode()
+
+    if packet[sep] == RAW:
+        return Packet(type, packet[sep + 1 :])
+
+    flags = packet[sep + 1]
+    offset = sep + 2
+
+    relay = None
+    if flags & FLAG_RELAY:
+        relay = RELAY.unpack_from(packet, offset)
+        offset += RELAY.size
+
+    payload = packet[offset:]
+    if flags & FLAG_COMPRESSED:
+        zdict = None
+        if flags & FLAG_ZDICT:
+            compression = (compressions or {}).get(type)
+            if compression is None or compression.zdict is None:
+                raise ValueError(
+                    f"{type} payload was compressed with a dictionary we don't have"
+                )
+            zdict = compression.zdict
+
+        payload = decompress(payload[1:], payload[0], zdict)
+
+    return Packet(type, payload, relay)
+
+
+def with_hops(packet: bytes, hops: int) -> bytes:
+    """Copy a relayed packet with its hops left replaced"""
+    offset = split(packet) + 2 + RELAY.size - 1
+    return packet[:offset] + bytes((hops,)) + packet[offset + 1 :]
@@ -4,7 +4,7 @@ from .group import GroupPeer
 from .workload import WorkloadPeer
 from .json import JsonPeer
 from .random import RandomPeer, RandomNetSeparatedPeer, RandomTaskablePeer
-from .taskable import TaskablePeer
+from .taskable import TaskablePeer, TaskFailedError
 
 __all__ = [
     "Peer",
@@ -15,4 +15,5 @@ __all__ = [
     "RandomNetSeparatedPeer",
     "RandomTaskablePeer",
     "TaskablePeer",
+    "TaskFailedError",
 ]
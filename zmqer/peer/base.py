@@ -2,40 +2,102 @@ from abc import ABC, abstractmethod
 import zmq.asyncio
 import asyncio
 import logging
+import random
+
+import zmqer.log
+from zmqer import packet
+from zmqer.channel import DEFAULT_CHANNELS, Channel
+from zmqer.compression import Compression
+from zmqer.misc import SeenCache
+from zmqer.monitor import monitor
+from zmqer.trace import RECV, SEND, TraceWriter
+
+
+def shared_context() -> zmq.asyncio.Context:
+    """The process-wide context, so all peers share one set of I/O threads"""
+    ctx = zmq.asyncio.Context.instance()
+    # Every peer holds a few sockets, plus a dealer per group member.
+    if ctx.get(zmq.MAX_SOCKETS) < ctx.get(zmq.SOCKET_LIMIT):
+        ctx.set(zmq.MAX_SOCKETS, ctx.get(zmq.SOCKET_LIMIT))
+
+    return ctx
 
 
 class Peer(ABC):
-    def __init__(self, address, log_to=None, log_level=logging.INFO):
+    def __init__(
+        self,
+        address,
+        log_to=None,
+        log_level=logging.INFO,
+        compression: dict[str, Compression] | None = None,
+        relay_ttl=0,
+        relay_types=None,
+        channels: dict[str, Channel] | None = None,
+        trace_path=None,
+        ctx: zmq.asyncio.Context | None = None,
+    ):
         # Peer setup
         self.address = address
         self._done = False
         self._tasks = []
+        # Background tasks, see spawn.
+        self.running = set()
+        # Per message type wire compression, see set_compression.
+        self.compression = dict(compression or {})
+
+        # Multi-hop relay: broadcasts of `relay_types` (all if None) are forwarded
+        # by every peer that receives them, for up to `relay_ttl` hops.
+        self.relay_ttl = relay_ttl
+        self.relay_types = set(relay_types) if relay_types is not None else None
+        self.seen = SeenCache()
+        # Ids of the relayed broadcasts we sent, whose copies we don't forward again.
+        self.originated = SeenCache()
+
+        # Capture every packet sent and received, see zmqer.trace.
+        self.trace = None
+        if trace_path is not None:
+            self.trace = TraceWriter(trace_path, address)
 
         # ZMQ / asyncio setup
         self.loop = asyncio.get_event_loop()
-        self.ctx = zmq.asyncio.Context()
-        self.pub_socket = self.ctx.socket(zmq.PUB)
-        self.sub_socket = self.ctx.socket(zmq.SUB)
-        self.sub_socket.setsockopt_string(zmq.SUBSCRIBE, "")
+        self.ctx = ctx if ctx is not None else shared_context()
+
+        # Channels, highest priority first, each with its own PUB/SUB pair.
+        #   Message types go out on the channel they were registered with, or on
+        #   the default one (data, if there is such a channel).
+        channels = channels if channels is not None else DEFAULT_CHANNELS
+        self.channels = dict(
+            sorted(channels.items(), key=lambda item: item[1].weight, reverse=True)
+        )
+        self.default_channel = "data" if "data" in channels else next(iter(channels))
+        self.channel_types = {}
+        self.pub_sockets = {}
+        self.sub_sockets = {}
+        for name, channel in self.channels.items():
+            pub_socket = self.ctx.socket(zmq.PUB)
+            pub_socket.setsockopt(zmq.SNDHWM, channel.hwm)
+            sub_socket = self.ctx.socket(zmq.SUB)
+            sub_socket.setsockopt(zmq.RCVHWM, channel.hwm)
+            sub_socket.setsockopt_string(zmq.SUBSCRIBE, "")
+            self.pub_sockets[name] = pub_socket
+            self.sub_sockets[name] = sub_socket
+
         self.message_types = {}
+        # Message types whose handlers get the raw payload bytes
+        self.binary_types = set()
 
         # Logging setup
-        self.logger = logging.getLogger(self.__class__.__name__)
+        #   Every peer gets its own logger, but all of them share one queue
+        #   handler per sink, so emitting a record never touches the sink itself.
+        self.logger = logging.getLogger(f"{self.__class__.__name__}:{self.address}")
         self.logger.propagate = False
 
-        handler = None
-        if log_to == "file":
-            handler = logging.FileHandler(f"logs/{self.address[6:]}.log")
-        elif log_to == "stdout":
-            handler = logging.StreamHandler()
-
-        if handler is not None and log_level is not None:
-            handler.setLevel(log_level)
-            handler.addFilter(logging.Filter(self.__class__.__name__))
-            handler.setFormatter(
-                logging.Formatter("%(filename)s:%(lineno)d>\t%(message)s")
-            )
+        handler = zmqer.log.get_handler(log_to) if log_level is not None else None
+        if handler is not None:
+            self.logger.setLevel(log_level)
             self.logger.addHandler(handler)
+        else:
+            self.logger.setLevel(logging.WARNING)
 
         self.__post_init__()
 
@@ -46,10 +108,48 @@ class Peer(ABC):
     async def broadcast_loop(self):
         pass
 
-    async def broadcast(self, type: str, message: str):
-        packet = f"{type}={message}"
-        await self.pub_socket.send_string(packet)
-        self.logger.debug(f"{self.address}:\n\tSent message: {packet}")
+    def set_compression(self, message_type: str, *args, **kwargs):
+        """Compress large payloads of `message_type`, see Compression"""
+        self.compression[message_type] = Compression(*args, **kwargs)
+
+    def encode_packet(
+        self, type: str, message: str | bytes, relay: tuple[int, int] | None = None
+    ) -> bytes:
+        """Build the packet, compressing the payload if configured, see zmqer.packet"""
+        payload = message if isinstance(message, bytes) else str(message).encode()
+        return packet.encode(type, payload, self.compression.get(type), relay)
+
+    def decode_packet(self, message: bytes) -> packet.Packet:
+        """Split a packet into its type, (decompressed) payload and relay header"""
+        return packet.decode(message, self.compression)
+
+    def channel_address(self, address: str, channel: str) -> str:
+        """The endpoint of `channel` for the peer at `address`"""
+        host, port = address.rsplit(":", 1)
+        return f"{host}:{int(port) + self.channels[channel].port_offset}"
+
+    def channel_of(self, type: str) -> str:
+        return self.channel_types.get(type, self.default_channel)
+
+    def relays(self, type: str) -> bool:
+        return self.relay_ttl > 0 and (
+            self.relay_types is None or type in self.relay_types
+        )
+
+    async def broadcast(
+        self, type: str, message: str | bytes, channel: str | None = None
+    ):
+        relay = None
+        if self.relays(type):
+            relay = (random.getrandbits(64), self.relay_ttl)
+            self.originated.seen(relay[0])
+
+        data = self.encode_packet(type, message, relay)
+        if self.trace is not None:
+            self.trace.write(SEND, data)
+
+        await self.pub_sockets[channel or self.channel_of(type)].send(data)
+        self.logger.debug("%s:\n\tSent message: %s=%s", self.address, type, message)
 
     @property
     def tasks(self) -> list[asyncio.Task]:
@@ -67,43 +167,120 @@ class Peer(ABC):
     def types(self) -> list[str]:
         return self.message_types.keys()
 
-    def register_message_type(self, message_type, handler, overwrite=False):
+    def register_message_type(
+        self, message_type, handler, overwrite=False, binary=False, channel=None
+    ):
+        if binary:
+            self.binary_types.add(message_type)
+
+        # Peers without that channel carry the type on their default one.
+        if channel in self.channels:
+            self.channel_types[message_type] = channel
+
         if message_type not in self.message_types or overwrite:
             self.message_types[message_type] = [handler]
         else:
             self.message_types[message_type].append(handler)
 
         self.logger.debug(
-            f"Registered message type: {message_type}, {handler.__class__.__name__} {overwrite=}"
+            "Registered message type: %s, %s overwrite=%s",
+            message_type,
+            handler.__class__.__name__,
+            overwrite,
         )
 
-    async def message_type_handler(self, message):
-        for message_type, handlers in self.message_types.items():
-            if message.startswith(f"{message_type}="):
-                received_data = message[len(message_type) + 1 :]
-                self.logger.debug(
-                    f"Received PACKET: {message_type}={received_data}, {handlers=}"
-                )
-                # TODO: can gather this?
-                for handler in handlers:
-                    await handler(self, received_data)
+    def unregister_message_type(self, message_type):
+        """Stop handling `message_type`, e.g. one a subclass doesn't support"""
+        self.message_types.pop(message_type, None)
+        self.binary_types.discard(message_type)
+        self.channel_types.pop(message_type, None)
+
+    async def forward(self, message: bytes) -> bool:
+        """Forward a relayed packet, returning False if it was seen before.
+
+        The first copy of our own broadcasts (usually the loopback one) is handled
+        like any other, but it's already been published so it isn't forwarded.
+        """
+        relay = packet.peek_relay(message)
+        if relay is None:
+            return True
+
+        message_id, hops = relay
+        if self.seen.seen(message_id):
+            return False
+
+        if hops > 1 and message_id not in self.originated:
+            forwarded = packet.with_hops(message, hops - 1)
+            if self.trace is not None:
+                self.trace.write(SEND, forwarded)
+
+            channel = self.channel_of(packet.peek_type(message))
+            await self.pub_sockets[channel].send(forwarded)
+
+        return True
+
+    async def message_type_handler(self, message: bytes):
+        # Duplicates of relayed packets are dropped before they are decoded.
+        if not await self.forward(message):
+            return
+
+        message_type, payload, _ = self.decode_packet(message)
+
+        handlers = self.message_types.get(message_type)
+        if handlers is None:
+            return
+
+        received_data = (
+            payload if message_type in self.binary_types else payload.decode()
+        )
+        self.logger.debug(
+            "Received PACKET: %s=%s, handlers=%s",
+            message_type,
+            received_data,
+            handlers,
+        )
+        # TODO: can gather this?
+        for handler in handlers:
+            await monitor.timed(
+                handler(self, received_data), "message", message_type, handler.__name__
+            )
 
     async def recv_loop(self):
+        """Receive from every channel, serving up to each channel's weight per round
+        with the highest priority first, so bulk traffic can't starve control traffic
+        """
+        poller = zmq.asyncio.Poller()
+        for sub_socket in self.sub_sockets.values():
+            poller.register(sub_socket, zmq.POLLIN)
+
         while not self.done:
             try:
-                message = await self.sub_socket.recv_string()
-
-                await self.message_type_handler(message)
+                ready = dict(await poller.poll())
+                for name, channel in self.channels.items():
+                    sub_socket = self.sub_sockets[name]
+                    if sub_socket not in ready:
+                        continue
+
+                    for _ in range(channel.weight):
+                        try:
+                            message = await sub_socket.recv(zmq.NOBLOCK)
+                        except zmq.Again:
+                            break
+
+                        if self.trace is not None:
+                            self.trace.write(RECV, message)
+                        await self.message_type_handler(message)
             except Exception as e:
                 # traceback.print_exc()
-                self.logger.error(
-                    f"Error: {e}, {type(self)} {type(self.sub_socket)} {type(message)}, {type(self.sub_socket.recv_string)}"
-                )
+                self.logger.error("Error: %s, %s", e, type(self))
 
     def setup(self):
         self._done = False
-        self.pub_socket.bind(self.address)
-        self.sub_socket.connect(self.address)
+        monitor.start(self.loop)
+        for name in self.channels:
+            address = self.channel_address(self.address, name)
+            self.pub_sockets[name].bind(address)
+            self.sub_sockets[name].connect(address)
 
         self._tasks = [
             self.loop.create_task(self.recv_loop()),
@@ -112,17 +289,27 @@ class Peer(ABC):
 
         return self._tasks
 
+    def spawn(self, coroutine):
+        """Run a coroutine in the background, it's cancelled on teardown"""
+        task = self.loop.create_task(coroutine)
+        self.running.add(task)
+        task.add_done_callback(self.running.discard)
+
     async def teardown(self):
         self._done = True
-        for task in self._tasks:
+        for task in (*self._tasks, *self.running):
             task.cancel()
 
-        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.gather(*self._tasks, *self.running, return_exceptions=True)
 
         self._tasks = []
+        await monitor.stop()
+
+        for socket in (*self.sub_sockets.values(), *self.pub_sockets.values()):
+            socket.close()
 
-        self.sub_socket.close()
-        self.pub_socket.close()
+        if self.trace is not None:
+            self.trace.close()
 
     def __repr__(self):
         return f"<Peer {str(self)}>"
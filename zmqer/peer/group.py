@@ -1,15 +1,32 @@
 import asyncio
+import contextlib
+import json
+from typing import Any
+
+import zmq
+
+from zmqer.monitor import start_profile
+from zmqer.trace import DIRECT, RECV, SEND
 
 from .base import Peer
 
+DIRECT_PORT_OFFSET = 10000
+
 
 class GroupPeer(Peer):
     TOTAL_HEALTH = 100
     NEW_PEER_DAMAGE = 1
 
-    def __init__(self, *args, group_broadcast_delay=5.0, **kwargs):
+    def __init__(
+        self,
+        *args,
+        group_broadcast_delay=5.0,
+        direct_port_offset=DIRECT_PORT_OFFSET,
+        **kwargs,
+    ):
         # Group setup
         self.group = {}
+        self.dealers = {}
 
         self.health = 0.0
         self.join_statuses = 0
@@ -17,9 +34,15 @@ class GroupPeer(Peer):
         self.broadcast_statuses = GroupPeer.TOTAL_HEALTH
 
         self.GROUP_BROADCAST_DELAY = group_broadcast_delay
+        # Resolved by the SNAPSHOT reply while bootstrapping.
+        self.synced: asyncio.Future | None = None
+        self.DIRECT_PORT_OFFSET = direct_port_offset
 
         super().__init__(*args, **kwargs)
 
+        # Direct channel: group members' DEALERs connect to our ROUTER.
+        self.router_socket = self.ctx.socket(zmq.ROUTER)
+
     @staticmethod
     async def JOINED_handler(peer: "GroupPeer", message):
         """Procced by a peer joining a group.
@@ -31,7 +54,7 @@ class GroupPeer(Peer):
         """
         # Lets make a new peer hurt the population.
         if message == "True":
-            peer.logger.debug(f"{peer.address}:\n\tNew peer joined")
+            peer.logger.debug("%s:\n\tNew peer joined", peer.address)
             damage = -GroupPeer.NEW_PEER_DAMAGE
         if message == "False":
             damage = 1
@@ -45,7 +68,10 @@ class GroupPeer(Peer):
         # Health is maximized when all joins were false.
         peer.health = peer.join_statuses / GroupPeer.TOTAL_HEALTH
         peer.logger.debug(
-            f"{peer.address}:\n\tPopulation health: {peer.health}\t broadcast ratio: {peer.broadcast_ratio}"
+            "%s:\n\tPopulation health: %s\t broadcast ratio: %s",
+            peer.address,
+            peer.health,
+            peer.broadcast_ratio,
         )
         return peer.health
 
@@ -79,9 +105,53 @@ class GroupPeer(Peer):
 
         return group
 
+    @staticmethod
+    async def PROFILE_handler(peer: "GroupPeer", message):
+        """Procced by a PROFILE=<seconds> control message.
+
+        Profiles the receiving peer's process for that long, see zmqer.monitor.
+        Send it direct to profile one peer, or broadcast it to profile the group.
+        """
+        start_profile(float(message), peer.loop)
+
+    @staticmethod
+    async def SYNC_handler(peer: "GroupPeer", message):
+        """Procced by a joining peer asking us, its seed, for a snapshot.
+
+        The message is the joining peer's address, the snapshot is sent straight
+        back to it once our connection to it is up, without holding up the direct
+        channel meanwhile.
+        """
+        peer.join_group(message)
+        snapshot = json.dumps(peer.snapshot())
+        peer.spawn(peer.send_direct(message, "SNAPSHOT", snapshot, wait=1.0))
+
+    @staticmethod
+    async def SNAPSHOT_handler(peer: "GroupPeer", message):
+        """Procced by our seed's reply to SYNC, see bootstrap"""
+        snapshot = json.loads(message)
+        peer.restore(snapshot)
+        if peer.synced is not None and not peer.synced.done():
+            peer.synced.set_result(snapshot["seed"])
+
+        # Members other than the seed don't know about us yet. Some may be down, so
+        # don't hold up the direct channel waiting on them.
+        for address in list(peer.group):
+            if address != snapshot["seed"]:
+                peer.spawn(peer.send_direct(address, "HELLO", peer.address, wait=1.0))
+
+    @staticmethod
+    async def HELLO_handler(peer: "GroupPeer", message):
+        """Procced by a bootstrapped peer announcing itself"""
+        peer.join_group(message)
+
     def __post_init__(self):
-        self.register_message_type("JOINED", self.JOINED_handler)
-        self.register_message_type("GROUP", self.GROUP_handler)
+        self.register_message_type("SYNC", self.SYNC_handler)
+        self.register_message_type("SNAPSHOT", self.SNAPSHOT_handler)
+        self.register_message_type("HELLO", self.HELLO_handler)
+        self.register_message_type("JOINED", self.JOINED_handler, channel="control")
+        self.register_message_type("GROUP", self.GROUP_handler, channel="control")
+        self.register_message_type("PROFILE", self.PROFILE_handler, channel="control")
 
     async def group_broadcast_stage(self):
         while not self.done:
@@ -91,7 +161,10 @@ class GroupPeer(Peer):
                     peers = self.peers
                     await self.broadcast("GROUP", peers)
                     self.logger.debug(
-                        f"{self.address}:\n\tBroadcasted group: {peers}\n\t\t{self.broadcast_ratio=}"
+                        "%s:\n\tBroadcasted group: %s\n\t\tself.broadcast_ratio=%s",
+                        self.address,
+                        peers,
+                        self.broadcast_ratio,
                     )
                     self.broadcast_statuses -= 1
                     if self.broadcast_statuses < 0:
@@ -103,20 +176,133 @@ class GroupPeer(Peer):
 
                 await asyncio.sleep(self.GROUP_BROADCAST_DELAY)
             except Exception as e:
-                self.logger.error(f"Error: {e}")
+                self.logger.error("Error: %s", e)
+
+    def direct_address(self, address):
+        """The ROUTER endpoint of the peer publishing on `address`"""
+        host, port = address.rsplit(":", 1)
+        return f"{host}:{int(port) + self.DIRECT_PORT_OFFSET}"
+
+    def dealer(self, address):
+        """Get or lazily connect the DEALER socket to `address`'s ROUTER"""
+        if address not in self.dealers:
+            dealer = self.ctx.socket(zmq.DEALER)
+            dealer.setsockopt(zmq.LINGER, 0)
+            # Only queue messages on a live connection, so sends to a peer that is
+            # down fail (see send_direct) instead of waiting for it forever.
+            dealer.setsockopt(zmq.IMMEDIATE, 1)
+            dealer.connect(self.direct_address(address))
+            self.dealers[address] = dealer
+
+        return self.dealers[address]
+
+    async def send_direct(
+        self, address, type: str, message: str | bytes, wait=0.0
+    ) -> bool:
+        """Send a packet point-to-point to the peer at `address`.
+
+        Returns False if there is no live connection to it, after retrying for up
+        to `wait` seconds (e.g. for a peer we only just joined), so callers can fall
+        back to broadcast.
+        """
+        if address is None or address == self.address:
+            return False
+
+        packet = self.encode_packet(type, message)
+        deadline = self.loop.time() + wait
+        while True:
+            try:
+                await self.dealer(address).send(packet, zmq.NOBLOCK)
+                break
+            except zmq.Again:
+                if self.loop.time() >= deadline:
+                    return False
+                await asyncio.sleep(0.01)
+
+        if self.trace is not None:
+            self.trace.write(SEND | DIRECT, packet)
+
+        self.logger.debug(
+            "%s:\n\tSent direct to %s: %s=%s", self.address, address, type, message
+        )
+        return True
+
+    async def direct_recv_loop(self):
+        while not self.done:
+            try:
+                _, message = await self.router_socket.recv_multipart()
+                if self.trace is not None:
+                    self.trace.write(RECV | DIRECT, message)
+
+                await self.message_type_handler(message)
+            except Exception as e:
+                self.logger.error("Error: %s, %s", e, type(self))
 
     def join_group(self, group_address):
         if group_address != self.address and group_address not in self.group:
-            self.sub_socket.connect(group_address)
-            self.group[group_address] = self.sub_socket
+            for name, sub_socket in self.sub_sockets.items():
+                sub_socket.connect(self.channel_address(group_address, name))
+            self.group[group_address] = self.sub_sockets
+            self.dealer(group_address)
             self.logger.debug(
-                f"{self.address}:\n\tJoined group: {group_address}\n\t\t{self.group}"
+                "%s:\n\tJoined group: %s\n\t\t%s",
+                self.address,
+                group_address,
+                self.group,
             )
             return True
         return False
 
+    def snapshot(self) -> dict[str, Any]:
+        """The state a joining peer needs, see bootstrap"""
+        return {"seed": self.address, "group": self.peers}
+
+    def restore(self, snapshot: dict[str, Any]):
+        """Apply a seed's snapshot"""
+        for address in snapshot["group"]:
+            self.join_group(address)
+
+    async def bootstrap(self, seeds: str | list[str], timeout=1.0, attempts=3) -> bool:
+        """Join the group of a seed peer in one request, rather than waiting for
+        GROUP broadcasts to reach us. Call it after setup.
+
+        Seeds are tried in turn, each waited on for `timeout` seconds, until one of
+        them replies or `attempts` requests went unanswered.
+        """
+        if isinstance(seeds, str):
+            seeds = [seeds]
+
+        self.synced = self.loop.create_future()
+        try:
+            for attempt in range(attempts):
+                seed = seeds[attempt % len(seeds)]
+                self.join_group(seed)
+                if await self.send_direct(seed, "SYNC", self.address, wait=timeout):
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(asyncio.shield(self.synced), timeout)
+                if self.synced.done():
+                    self.logger.debug("Bootstrapped from %s", self.synced.result())
+                    return True
+
+                self.logger.warning("No snapshot from seed %s", seed)
+        finally:
+            self.synced = None
+
+        self.logger.warning("Bootstrap failed, joining through GROUP broadcasts")
+        return False
+
     def setup(self):
         super().setup()
+        self.router_socket.bind(self.direct_address(self.address))
+        self._tasks.append(self.loop.create_task(self.direct_recv_loop()))
         self._tasks.append(self.loop.create_task(self.group_broadcast_stage()))
 
         return self.tasks
+
+    async def teardown(self):
+        await super().teardown()
+
+        for dealer in self.dealers.values():
+            dealer.close()
+        self.dealers = {}
+        self.router_socket.close()
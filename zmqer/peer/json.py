@@ -21,7 +21,7 @@ class JsonPeer(WorkloadPeer, metaclass=ABCMeta):
                 await peer.broadcast("JSON", json.dumps(results))
 
         except json.JSONDecodeError as e:
-            peer.logger.error(f"Error: {e}")
+            peer.logger.error("Error: %s", e)
 
     def __post_init__(self):
         super().__post_init__()
@@ -1,6 +1,7 @@
 from random import randint
 from typing import Any
 
+from ..task import Task
 from .json import JsonPeer
 from .taskable import TaskablePeer
 
@@ -43,24 +44,27 @@ class RandomNetSeparatedPeer(JsonPeer):
 class RandomTaskablePeer(TaskablePeer):
     _counter = 0
 
+    def __init__(self, *args, generate_workload=True, **kwargs):
+        super().__init__(*args, generate_workload=generate_workload, **kwargs)
+
     @staticmethod
-    def ability(peer, data: dict[str, Any]):
-        RandomTaskablePeer._counter += int(data["random"])
+    def ability(peer, task: Task):
+        RandomTaskablePeer._counter += int(task.payload["random"])
         print(
-            f"{data['sender']} requested TaskablePeer.ability completed by {peer.address} on {data}\n\tResult: {RandomTaskablePeer._counter}"
+            f"{task.sender} requested TaskablePeer.ability completed by {peer.address} on {task}\n\tResult: {RandomTaskablePeer._counter}"
         )
 
     def __post_init__(self):
         super().__post_init__()
         self.register_ability("print_ability", self.ability)
 
-    def handle_completed_task(self, data: dict[str, Any]):
-        print(f"Got my completed task back: {data}")
+    def handle_completed_task(self, task: Task):
+        print(f"Got my completed task back: {task} {task.results}")
 
-    def workload(self) -> dict[str, Any]:
-        data = super().workload()
-        data.update({"random": randint(1, 100)})
+    def workload(self) -> Task:
+        task = super().workload()
+        task.payload.update({"random": randint(1, 100)})
 
-        data["todo"] = "print_ability"
+        task.todo = "print_ability"
 
-        return data
+        return task
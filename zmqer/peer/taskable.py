@@ -1,136 +1,653 @@
-from abc import abstractmethod
 import asyncio
+import collections
+import inspect
 import json
-from random import randint
 import random
 import time
 from typing import Any
 
+from ..journal import Journal
+from ..monitor import monitor
+from ..task import Task, TaskStatus
 from .json import JsonPeer
 
 # Note the usage of tasks here refers to taskable peer abilities, not asyncio tasks.
 
 
+class TaskFailedError(Exception):
+    """Raised through a submitted task's future when the task failed"""
+
+    def __init__(self, task: Task):
+        super().__init__(task.results)
+        self.task = task
+
+
 class TaskablePeer(JsonPeer):
     OLD_TASK_THRESHOLD = 30.0
+    # Granted tasks that a thief hasn't accepted by then are taken back.
+    GRANT_TIMEOUT = 5.0
 
-    def __init__(self, *args, group_broadcast_delay=5, **kwargs):
+    def __init__(
+        self,
+        *args,
+        group_broadcast_delay=5,
+        journal_path=None,
+        generate_workload=False,
+        max_inflight=1024,
+        steal_interval=0.5,
+        **kwargs,
+    ):
         self.abilities = {}
-        self.queue = []
+        self.ability_limits = {}
+        self.ability_timeouts = {}
+        # Tasks pending on other peers, by id, oldest first.
+        self.queue: dict[bytes, Task] = {}
+        self.futures = {}
+        # Tasks we sent point-to-point, by id, until their results come back. The
+        # ones without results after OLD_TASK_THRESHOLD are sent to another peer, in
+        # case the one we sent them to went down, see resend.
+        self.sent: dict[bytes, Task] = {}
+        # Results waiting to be sent, by sender, see deliver.
+        self.outbox: dict[str, list[Task]] = {}
+        # Send the group a generated task every 0.5-1s, see workload.
+        self.generate_workload = generate_workload
+
+        # Tasks we accepted wait in the backlog until one of `max_inflight` slots
+        # frees up (tasks waiting on an ability's concurrency limit don't hold one).
+        # Idle peers steal from the backlogs of busy ones, every `steal_interval`
+        # seconds (None disables stealing).
+        self.backlog: collections.deque[Task] = collections.deque()
+        self.inflight = 0
+        self.max_inflight = max_inflight
+        # Tasks granted to thieves, by id, until they are committed or reclaimed, and
+        # tasks offered to us, until they are committed to us, see STEAL_handler.
+        self.granted: dict[bytes, Task] = {}
+        self.offered: dict[bytes, Task] = {}
+        self.steal_interval = steal_interval
+
+        # Queued and running tasks survive a restart when journaled.
+        self.journal = None
+        if journal_path is not None:
+            self.journal = Journal(journal_path)
+            for record in self.journal.get("queue").values():
+                task = Task.from_record(record)
+                self.queue[task.id] = task
+
         super().__init__(*args, group_broadcast_delay=group_broadcast_delay, **kwargs)
 
-    def register_ability(self, task: str, handler, overwrite=False):
-        """Register a task"""
+    def register_ability(
+        self, task: str, handler, overwrite=False, concurrency=None, timeout=None
+    ):
+        """Register a task
+
+        Handlers may be plain callables or coroutine functions. Coroutine handlers
+        run concurrently, at most `concurrency` at a time for this task, and are
+        cancelled after `timeout` seconds.
+        """
         if task not in self.abilities or overwrite:
             self.abilities[task] = [handler]
         else:
             self.abilities[task].append(handler)
 
-    def do_abilities(self, data: dict[str, Any]):
-        """Complete tasks"""
-        todo_abilities = data["todo"].split(";")
+        if concurrency is not None:
+            self.ability_limits[task] = asyncio.Semaphore(concurrency)
+        if timeout is not None:
+            self.ability_timeouts[task] = timeout
+
+    async def do_ability(self, ability: str, task: Task):
+        """Run every handler of one ability, returning the last non-None result"""
+        result = None
+        limit = self.ability_limits.get(ability)
+        if limit is not None:
+            await self.acquire(limit)
+
+        try:
+            for handler in self.abilities[ability]:
+                label = ("ability", ability, handler.__name__)
+                with monitor.track(*label):
+                    output = handler(self, task)
+                if inspect.isawaitable(output):
+                    output = await asyncio.wait_for(
+                        monitor.timed(output, *label),
+                        self.ability_timeouts.get(ability),
+                    )
+                if output is not None:
+                    result = output
+        finally:
+            if limit is not None:
+                limit.release()
+
+        return result
+
+    async def acquire(self, limit: asyncio.Semaphore):
+        """Acquire an ability's concurrency limit.
+
+        Tasks waiting on it give up their slot meanwhile, so a burst for one ability
+        can't take every slot and starve the others, see max_inflight.
+        """
+        if not limit.locked():
+            await limit.acquire()
+            return
+
+        self.inflight -= 1
+        self.pump()
+        try:
+            await limit.acquire()
+        finally:
+            self.inflight += 1
+
+    async def do_abilities(self, task: Task) -> Task:
+        """Complete tasks
+
+        A `todo` of "a;b;c" is run as a pipeline, each stage sees the results of
+        the previous one in task.results.
+        """
+        todo_abilities = task.todo.split(";") if task.todo else []
 
         for ability in todo_abilities:
-            if data["todo"] in self.abilities:
-                for handler in self.abilities[ability]:
-                    handler(self, data)
+            if ability not in self.abilities:
+                self.logger.error("Task %s not registered", ability)
+                task.status = TaskStatus.FAILED
+                task.results = f"Task {ability} not registered on {self.address}"
+                return task
+
+            try:
+                result = await self.do_ability(ability, task)
+            except asyncio.TimeoutError:
+                self.logger.error("Task %s timed out", ability)
+                task.status = TaskStatus.FAILED
+                task.results = f"Task {ability} timed out on {self.address}"
+                return task
+            except Exception as e:
+                self.logger.error("Task %s failed: %s", ability, e)
+                task.status = TaskStatus.FAILED
+                task.results = f"Task {ability} failed on {self.address}: {e}"
+                return task
+
+            if result is not None:
+                task.results = result
+
+        task.status = TaskStatus.COMPLETE
+        if task.results is None:
+            task.results = f"Task completed by {self.address}"
+        self.logger.debug("Task completed by %s", self.address)
+
+        return task
+
+    async def complete(self, task: Task):
+        """Do the abilities of a task and deliver its results, then free its slot"""
+        try:
+            await self.do_abilities(task)
+            self.deliver(task)
+        except Exception as e:
+            self.logger.error("Error: %s", e)
+        finally:
+            self.inflight -= 1
+            self.pump()
+
+    def deliver(self, task: Task):
+        """Resolve a task we submitted ourselves, or send its results to its sender.
+
+        Results that are ready in the same loop iteration go back to their sender
+        together in a single message.
+        """
+        if task.sender == self.address:
+            self.finish_task(task)
+            if self.journal is not None:
+                self.journal.delete("running", task.id.hex())
+            return
+
+        self.remove_from_queue(task)
+        if not self.outbox:
+            self.spawn(self.flush())
+        self.outbox.setdefault(task.sender, []).append(task)
+
+    async def flush(self):
+        """Send the results in the outbox, one message per sender"""
+        outbox, self.outbox = self.outbox, {}
+        for results in outbox.values():
+            try:
+                await self.send_results(results)
+            except Exception as e:
+                self.logger.error("Error: %s", e)
+                continue
+
+            if self.journal is not None:
+                for task in results:
+                    self.journal.delete("running", task.id.hex())
+
+    def run_batch(self, batch: list[Task]):
+        """Schedule tasks so that slow abilities don't hold up the receive loop"""
+        if self.journal is not None:
+            for task in batch:
+                self.journal.put("running", task.id.hex(), task.to_record())
+
+        self.backlog.extend(batch)
+        self.pump()
+
+    def pump(self):
+        """Start backlogged tasks while there are free slots, each on its own"""
+        while self.backlog and self.inflight < self.max_inflight:
+            self.inflight += 1
+            self.spawn(self.complete(self.backlog.popleft()))
+
+    def grant(self, n: int) -> list[Task]:
+        """Give up to `n` backlogged tasks, at most half of the backlog, to a thief.
+
+        Stolen tasks come off the far end of the backlog and were never started.
+        They stay journaled as running until they are committed to the thief, see
+        ACCEPT_handler, or are taken back after GRANT_TIMEOUT, see reclaim.
+        """
+        n = min(n, len(self.backlog) // 2)
+        granted = [self.backlog.pop() for _ in range(n)]
+        for task in granted:
+            self.granted[task.id] = task
+
+        return granted
+
+    def reclaim(self, ids: list[bytes]):
+        """Run the granted tasks among `ids` that were never committed ourselves"""
+        tasks = [self.granted.pop(id) for id in ids if id in self.granted]
+        if not tasks or self.done:
+            return
+
+        self.logger.warning("%d granted tasks were not accepted", len(tasks))
+        for task in tasks:
+            task.priority = self.address
+        self.run_batch(tasks)
+
+    def withdraw(self, ids: list[bytes]):
+        """Drop the tasks among `ids` offered to us, they won't be committed"""
+        for id in ids:
+            self.offered.pop(id, None)
+
+    @staticmethod
+    async def STEAL_handler(peer: "TaskablePeer", message: str):
+        """Procced by an idle peer asking for some of our backlog.
+
+        The handoff is fenced so that no task runs on both peers: the granted tasks
+        are offered in a GRANT, the thief replies ACCEPT and only runs the ones we
+        COMMIT, which are those we haven't reclaimed in the meantime.
+        """
+        thief, n = json.loads(message)
+        granted = peer.grant(n)
+        if not granted:
+            return
+
+        for task in granted:
+            task.priority = thief
+
+        ids = [task.id for task in granted]
+        grant = peer.address.encode() + b"\n" + Task.encode_batch(granted)
+        if await peer.send_direct(thief, "GRANT", grant):
+            peer.logger.debug("Granted %d tasks to %s", len(granted), thief)
+            peer.loop.call_later(TaskablePeer.GRANT_TIMEOUT, peer.reclaim, ids)
+        else:
+            # Couldn't hand them over, keep them.
+            peer.reclaim(ids)
+
+    @staticmethod
+    async def GRANT_handler(peer: "TaskablePeer", message: bytes):
+        """Procced by a victim offering us part of its backlog, see STEAL_handler.
+
+        The message is the victim's address and a packed batch of tasks. They are
+        held until the victim commits them, see COMMIT_handler.
+        """
+        victim, batch = message.split(b"\n", 1)
+        tasks = Task.decode_batch(batch)
+        for task in tasks:
+            peer.offered[task.id] = task
+
+        # Offers whose COMMIT never comes are dropped, their sender resends them.
+        ids = [task.id for task in tasks]
+        peer.loop.call_later(TaskablePeer.OLD_TASK_THRESHOLD, peer.withdraw, ids)
+
+        accepted = json.dumps([peer.address, [id.hex() for id in ids]])
+        await peer.send_direct(victim.decode(), "ACCEPT", accepted)
+
+    @staticmethod
+    async def ACCEPT_handler(peer: "TaskablePeer", message: str):
+        """Procced by a thief accepting granted tasks.
+
+        The ones we haven't reclaimed are committed to the thief, the others are
+        already running here and the thief drops them.
+        """
+        thief, ids = json.loads(message)
+        committed, reclaimed = [], []
+        for id in ids:
+            task = peer.granted.pop(bytes.fromhex(id), None)
+            if task is None:
+                reclaimed.append(id)
             else:
-                self.logger.error(f"Task {ability} not registered")
+                committed.append(task)
 
-        data["status"] = "complete"
-        data["results"] = f"Task completed by {self.address}"
-        self.logger.debug(f"Task completed by {self.address}")
+        commit = json.dumps([[task.id.hex() for task in committed], reclaimed])
+        if not await peer.send_direct(thief, "COMMIT", commit):
+            # The thief won't run them without the COMMIT, so we do.
+            for task in committed:
+                peer.granted[task.id] = task
+            peer.reclaim([task.id for task in committed])
+            return
+
+        if peer.journal is not None:
+            for task in committed:
+                peer.journal.delete("running", task.id.hex())
+
+    @staticmethod
+    async def COMMIT_handler(peer: "TaskablePeer", message: str):
+        """Procced by a victim handing over the tasks we accepted, see ACCEPT_handler"""
+        committed, reclaimed = json.loads(message)
+        peer.withdraw([bytes.fromhex(id) for id in reclaimed])
+
+        tasks = [peer.offered.pop(bytes.fromhex(id), None) for id in committed]
+        peer.handle_batch([task for task in tasks if task is not None])
 
-        return data
+    async def steal_loop(self):
+        """Ask a random group peer for work whenever we have spare slots"""
+        while not self.done:
+            try:
+                await asyncio.sleep(self.steal_interval)
 
-    def remove_from_queue(self, data: dict[str, Any]):
+                spare = self.max_inflight - self.inflight
+                if self.backlog or spare < self.max_inflight // 2 or not self.group:
+                    continue
+
+                victim = random.choice(list(self.group.keys()))
+                request = json.dumps([self.address, spare])
+                await self.send_direct(victim, "STEAL", request)
+            except Exception as e:
+                self.logger.error("Error: %s", e)
+
+    def remove_from_queue(self, task: Task):
         """Remove a task from the queue"""
-        # TODO: UUIDs
-        times = enumerate([task["time"] for task in self.queue])
-        for i, t in times:
-            if t == data["time"]:
-                ignored = self.queue.pop(i)
-                self.logger.debug(f"Removed task {ignored} from queue")
-                break
-
-    def append_to_queue(self, data: dict[str, Any]):
+        ignored = self.queue.pop(task.id, None)
+        if ignored is not None:
+            if self.journal is not None:
+                self.journal.delete("queue", task.id.hex())
+            self.logger.debug("Removed task %s from queue", ignored)
+
+    def append_to_queue(self, task: Task):
         """Append a task to the queue"""
         # if it's not already in the queue
-        times = enumerate([task["time"] for task in self.queue])
-        for i, t in times:
-            if t == data["time"]:
-                return
+        if task.id in self.queue:
+            return
+
+        self.queue[task.id] = task
+        if self.journal is not None:
+            self.journal.put("queue", task.id.hex(), task.to_record())
 
-        self.queue.append(data)
+    def snapshot(self) -> dict[str, Any]:
+        snapshot = super().snapshot()
+        snapshot["queue"] = [task.to_record() for task in self.queue.values()]
+        return snapshot
 
-    @abstractmethod
-    def handle_completed_task(self, data: dict[str, Any]):
-        """Handle a completed task"""
+    def restore(self, snapshot: dict[str, Any]):
+        super().restore(snapshot)
+        for record in snapshot.get("queue", []):
+            self.append_to_queue(Task.from_record(record))
+
+    def handle_completed_task(self, task: Task):
+        """Handle a completed task that wasn't submitted, e.g. a generated workload"""
         pass
 
-    def handle_work(self, data: dict[str, Any]):
-        """Handle the workload"""
+    def finish_task(self, task: Task):
+        """Handle a finished task, resolving its future if it was submitted"""
+        self.remove_from_queue(task)
+
+        if task.sender != self.address:
+            # Completions we merely overhear are not bounced any further.
+            return
+
+        self.sent.pop(task.id, None)
+
+        future = self.futures.pop(task.id, None)
+        if future is None:
+            self.handle_completed_task(task)
+        elif not future.done():
+            if task.status == TaskStatus.COMPLETE:
+                future.set_result(task)
+            else:
+                future.set_exception(TaskFailedError(task))
+
+    def accept(self, task: Task) -> bool:
+        """Route a received task, returning True if this peer should run it"""
         # Ignore self-broadcasts
         if (
-            data["sender"] == self.address
-            and data["priority"] != self.address
-            and data["status"] != "complete"
+            task.sender == self.address
+            and task.priority != self.address
+            and not task.finished
         ):
-            return
+            return False
+
+        # Results reach the sender point-to-point, see send_results.
+        if task.finished:
+            self.finish_task(task)
+            return False
 
         # Complete old tasks not completed by the priority peer
-        if data["status"] != "complete":
-            if (
-                data["status"] == "pending"
-                and data["time"] < time.time() - TaskablePeer.OLD_TASK_THRESHOLD
-            ):
-                data = self.do_abilities(data)
-            # If a priority address is given, then that address is the only one that can complete the task.
-            # Otherwise, any peer can complete the task.
-            elif data["priority"] is None or data["priority"] == self.address:
-                data = self.do_abilities(data)
-            else:
-                data["status"] = "pending"
-                self.append_to_queue(data)
+        if (
+            task.status == TaskStatus.PENDING
+            and task.time < time.time() - TaskablePeer.OLD_TASK_THRESHOLD
+        ):
+            return True
+        # If a priority address is given, then that address is the only one that can complete the task.
+        # Otherwise, any peer can complete the task.
+        elif task.priority is None or task.priority == self.address:
+            return True
 
-        if data["status"] == "complete":
-            self.remove_from_queue(data)
+        task.status = TaskStatus.PENDING
+        self.append_to_queue(task)
+        return False
 
-            if data["sender"] == self.address:
-                return self.handle_completed_task(data)
-            else:
-                # TODO: SENDER NEEDS TO ACKNOWLEDGE THE COMPLETION
-                # This is a rebroadcast to bounce the results back to the sender.
-                # We need to invalidate this bounce when the sender receives the results.
-                return data
+    @staticmethod
+    async def TASK_handler(peer: "TaskablePeer", message: bytes):
+        """Decode a packed batch of tasks"""
+        peer.handle_batch(Task.decode_batch(message))
+
+    def __post_init__(self):
+        super().__post_init__()
+        # Tasks travel as TASK, JsonPeer's JSON workloads aren't Tasks.
+        self.unregister_message_type("JSON")
+        self.register_message_type("STEAL", self.STEAL_handler)
+        self.register_message_type("GRANT", self.GRANT_handler, binary=True)
+        self.register_message_type("ACCEPT", self.ACCEPT_handler)
+        self.register_message_type("COMMIT", self.COMMIT_handler)
+        # Registered last, it's the workload type, see WorkloadPeer.
+        self.register_message_type("TASK", self.TASK_handler, binary=True)
+
+    def handle_work(self, task: Task):
+        """Handle the workload"""
+        if self.accept(task):
+            self.run_batch([task])
+
+    def handle_batch(self, batch: list[Task]):
+        """Handle a batch of workloads, running the accepted tasks together"""
+        batch = [task for task in batch if self.accept(task)]
+        if batch:
+            self.run_batch(batch)
+
+    async def send_results(self, results: list[Task]):
+        """Send results straight to the tasks' sender, broadcast only as a fallback"""
+        message = Task.encode_batch(results)
+        if not await self.send_direct(results[0].sender, "TASK", message):
+            await self.broadcast("TASK", message)
+
+    def new_task(
+        self, todo: str | None, payload: dict[str, Any] | None = None, priority=None
+    ) -> Task:
+        """Create a task for `todo`, run by `priority` or any peer if it's None"""
+        return Task(self.address, todo, payload, priority)
+
+    def submit(
+        self,
+        ability: str,
+        payload: dict[str, Any] | None = None,
+        priority=None,
+        timeout=None,
+    ) -> asyncio.Future:
+        """Submit a task, returning a future for the completed task.
+
+        See submit_many.
+        """
+        return self.submit_many(ability, [payload], priority, timeout)[0]
+
+    def submit_many(
+        self,
+        ability: str,
+        payloads: list[dict[str, Any] | None],
+        priority=None,
+        timeout=None,
+    ) -> list[asyncio.Future]:
+        """Submit one task per payload, all packed into a single message.
+
+        Tasks go to `priority`, or a random group peer if it's None (any peer when
+        the group is empty). Each future resolves to its completed task, raises
+        TaskFailedError if the task failed or asyncio.TimeoutError after `timeout`.
+        Cancelling a future drops its results.
+        """
+        if not payloads:
+            return []
+
+        if priority is None and self.group:
+            priority = random.choice(list(self.group.keys()))
+
+        batch = [self.new_task(ability, payload, priority) for payload in payloads]
+        futures = [self.track(task.id, timeout) for task in batch]
+        self.spawn(self.send_tasks(batch))
 
-        # broadcast the results
-        # await self.broadcast("COMPLETE", json.dumps(data))
+        return futures
 
-    async def workload_wrapper(self) -> str:
+    def track(self, task_id: bytes, timeout=None) -> asyncio.Future:
+        """Create the future for a submitted task"""
+        future = self.loop.create_future()
+        self.futures[task_id] = future
+
+        if timeout is not None:
+            timer = self.loop.call_later(timeout, self.expire, task_id)
+            future.add_done_callback(lambda _: timer.cancel())
+
+        # Keep timed out or cancelled futures around for a while, so their late
+        # results are dropped instead of reaching handle_completed_task.
+        future.add_done_callback(
+            lambda _: self.loop.call_later(
+                TaskablePeer.OLD_TASK_THRESHOLD, self.futures.pop, task_id, None
+            )
+        )
+
+        return future
+
+    def expire(self, task_id: bytes):
+        """Time out a submitted task"""
+        future = self.futures.get(task_id)
+        if future is not None and not future.done():
+            future.set_exception(
+                asyncio.TimeoutError(f"Task {task_id.hex()} timed out")
+            )
+
+    async def send_tasks(self, batch: list[Task]):
+        """Send tasks to their priority peer, broadcasting if there is none"""
+        message = Task.encode_batch(batch)
+        if await self.send_direct(batch[0].priority, "TASK", message):
+            self.expect(batch)
+        else:
+            await self.broadcast("TASK", message)
+
+    def expect(self, batch: list[Task]):
+        """Remember tasks sent point-to-point, see resend"""
+        for task in batch:
+            self.sent[task.id] = task
+
+        ids = [task.id for task in batch]
+        self.loop.call_later(TaskablePeer.OLD_TASK_THRESHOLD, self.resend, ids)
+
+    def resend(self, ids: list[bytes]):
+        """Send the tasks among `ids` that never got results to another peer.
+
+        The peer we sent them to may be down, so another group member (or the same
+        one, if it's the only one) becomes their priority peer and runs them.
+        """
+        batch = [self.sent.pop(id) for id in ids if id in self.sent]
+        if not batch or self.done:
+            return
+
+        others = [address for address in self.group if address != batch[0].priority]
+        priority = random.choice(others) if others else batch[0].priority
+        self.logger.warning(
+            "No results for %d direct tasks, resending to %s", len(batch), priority
+        )
+        for task in batch:
+            task.priority = priority
+        self.spawn(self.send_tasks(batch))
+
+    async def broadcast_loop(self):
+        """Send generated workloads, if enabled, tasks are otherwise submitted"""
+        if self.generate_workload:
+            await super().broadcast_loop()
+
+    async def workload_wrapper(self) -> bytes | None:
         # Let it be known that this sleep is kinda freaking important.
         # We need some sort of async load balancing between processing requests and working on tasks.
         # Without this sleep, suffice to say the peer will become completely unresponsive while working on a series of tasks.
         await asyncio.sleep(random.uniform(0.5, 1))
-        return await super().workload_wrapper()
+        # Nobody to send a new task to yet.
+        if not self.group and not self.queue:
+            return None
+
+        task = self.workload()
+        workload = task.encode()
+
+        # New tasks aimed at a specific peer go point-to-point, not to the whole group.
+        # Queued (pending) tasks are still broadcast so any peer can pick up old ones.
+        if task.status == TaskStatus.NEW and await self.send_direct(
+            task.priority, "TASK", workload
+        ):
+            self.expect([task])
+            return None
+
+        return workload
+
+    async def teardown(self):
+        # Backlogged tasks are still journaled as running, if there is a journal.
+        self.backlog.clear()
+        await super().teardown()
+
+        if self.journal is not None:
+            await self.journal.close()
+
+    def setup(self):
+        super().setup()
+
+        if self.steal_interval is not None:
+            self._tasks.append(self.loop.create_task(self.steal_loop()))
+
+        if self.journal is not None:
+            self._tasks.append(self.loop.create_task(self.journal.commit_loop()))
+
+            # Tasks that were running when we went down are run again.
+            running = [
+                Task.from_record(record)
+                for record in self.journal.get("running").values()
+            ]
+            if running:
+                self.logger.info("Resuming %d journaled tasks", len(running))
+                self.run_batch(running)
+
+        return self.tasks
 
-    def workload(self) -> dict[str, Any]:
-        data = super().workload()
-        # get any peer in the group
-        peer = list(self.group.keys())[randint(0, len(self.group) - 1)]
+    def workload(self) -> Task:
+        payload = super().workload()
 
         if len(self.queue) > 0:
-            data = self.queue[0]
-            self.queue.remove(data)
+            task = next(iter(self.queue.values()))
+            self.remove_from_queue(task)
         else:
-            data.update(
-                {
-                    "sender": self.address,
-                    "priority": peer,  # or None, if not given any Peer can complete the task and broadcast the results.
-                    "todo": None,
-                    "status": False,
-                    "results": None,
-                }
+            # get any peer in the group
+            peer = random.choice(list(self.group.keys()))
+            task = self.new_task(
+                None,
+                payload,
+                priority=peer,  # or None, if not given any Peer can complete the task and broadcast the results.
             )
+            task.time = payload.pop("time")
 
-        return data
+        return task
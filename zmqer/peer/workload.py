@@ -4,9 +4,13 @@ from . import GroupPeer
 
 
 class WorkloadPeer(GroupPeer, metaclass=ABCMeta):
-    def register_message_type(self, message_type, handler, overwrite=False):
+    def register_message_type(
+        self, message_type, handler, overwrite=False, binary=False, channel=None
+    ):
         self.__workload_type = message_type
-        return super().register_message_type(message_type, handler, overwrite)
+        return super().register_message_type(
+            message_type, handler, overwrite, binary, channel
+        )
 
     @abstractmethod
     def handle_work(self, data: str):
@@ -14,8 +18,8 @@ class WorkloadPeer(GroupPeer, metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    async def workload_wrapper(self) -> str:
-        """Produce the workload"""
+    async def workload_wrapper(self) -> str | bytes | None:
+        """Produce the workload, or None if it was already sent"""
         pass
 
     async def broadcast_loop(self):
@@ -24,6 +28,8 @@ class WorkloadPeer(GroupPeer, metaclass=ABCMeta):
             try:
                 # TODO: multiple workloads so we can register and run awaitables
                 data = await getattr(self, "workload_wrapper")()
-                await self.broadcast(self.__workload_type, data)
+                # A wrapper may deliver the workload itself, e.g. point-to-point.
+                if data is not None:
+                    await self.broadcast(self.__workload_type, data)
             except Exception as e:
-                self.logger.error(f"Error: {e}")
+                self.logger.error("Error: %s", e)
@@ -0,0 +1,136 @@
+import argparse
+import asyncio
+import importlib
+import logging
+from random import randint
+import time
+
+from zmqer.misc import connect_all
+from zmqer.trace import TraceReader, replay
+
+
+def load_peer_class(path: str):
+    """Import a peer class given as module:Class"""
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def argparser():
+    parser = argparse.ArgumentParser(
+        description="Replay the received packets of a trace into a group of peers."
+    )
+    parser.add_argument("trace", type=str, help="Trace file, see --trace-dir.")
+    parser.add_argument(
+        "-s",
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Replay this many times faster than recorded. (0 replays at max speed)",
+    )
+    parser.add_argument(
+        "-n",
+        "--n-peers",
+        type=int,
+        default=1,
+        help="Number of peers to replay into, every peer gets every packet.",
+    )
+    parser.add_argument(
+        "-p",
+        "--peer",
+        type=str,
+        default="zmqer.peer.random:RandomTaskablePeer",
+        help="Peer class to replay into, as module:Class.",
+    )
+    parser.add_argument(
+        "-a",
+        "--address",
+        type=str,
+        default=None,
+        help="Address of the first peer. (defaults to the traced peer's address)",
+    )
+    parser.add_argument(
+        "-sp",
+        "--starting-port",
+        type=int,
+        default=5555 + randint(0, 1000),
+        help="Starting port for the other peers. (defaults to 5555+randint(1000))",
+    )
+    parser.add_argument(
+        "-o",
+        "--offline",
+        action="store_true",
+        help="Don't set up the peers, so nothing but the replayed packets runs.",
+    )
+    parser.add_argument(
+        "-v",
+        "--log-level",
+        type=str,
+        default="WARNING",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        help="Logging level",
+    )
+
+    return parser.parse_args()
+
+
+def busy(peer) -> bool:
+    """Whether a peer still has replayed work backlogged or running"""
+    return bool(getattr(peer, "backlog", None)) or getattr(peer, "inflight", 0) > 0
+
+
+async def drain(peers, poll_interval=0.01):
+    while any(busy(peer) for peer in peers):
+        await asyncio.sleep(poll_interval)
+
+
+async def run(args):
+    trace = TraceReader(args.trace)
+    Peer = load_peer_class(args.peer)
+
+    # Tasks are routed by address, so the first peer stands in for the traced one.
+    addresses = [args.address or trace.address] + [
+        f"tcp://127.0.0.1:{port}"
+        for port in range(args.starting_port, args.starting_port + args.n_peers - 1)
+    ]
+    peers = [
+        Peer(address, log_to="stdout", log_level=args.log_level)
+        for address in addresses
+    ]
+    if len(peers) > 1:
+        connect_all(peers)
+
+    if not args.offline:
+        for peer in peers:
+            peer.setup()
+
+    try:
+        start = time.perf_counter()
+        count = await replay(trace, peers, speed=args.speed if args.speed > 0 else None)
+        dispatched = time.perf_counter() - start
+        # Handlers only schedule the work, wait for it to be done as well.
+        await drain(peers)
+        elapsed = time.perf_counter() - start
+        logging.warning(
+            "Replayed %d packets into %d peers: dispatched in %.3fs (%.0f packets/s),"
+            " done in %.3fs (%.0f packets/s)",
+            count,
+            len(peers),
+            dispatched,
+            count / dispatched if dispatched else 0.0,
+            elapsed,
+            count / elapsed if elapsed else 0.0,
+        )
+    finally:
+        if not args.offline:
+            await asyncio.gather(*(p.teardown() for p in peers), return_exceptions=True)
+
+
+def main():
+    args = argparser()
+    logging.basicConfig(level=args.log_level)
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+from enum import IntEnum
+import json
+import struct
+import sys
+import time
+from typing import Any
+import uuid
+
+
+class TaskStatus(IntEnum):
+    NEW = 0
+    PENDING = 1
+    COMPLETE = 2
+    FAILED = 3
+
+
+_now = time.time
+_statuses = tuple(TaskStatus)
+
+# Decoded peer addresses and ability names, interned, keyed by their raw bytes.
+# They come off the network, so only the first MAX_STRINGS distinct ones are kept.
+MAX_STRINGS = 4096
+_strings: dict[bytes, str] = {}
+
+
+def _intern(raw: bytes) -> str | None:
+    if not raw:
+        return None
+
+    string = _strings.get(raw)
+    if string is None:
+        string = raw.decode()
+        if len(_strings) < MAX_STRINGS:
+            string = _strings[raw] = sys.intern(string)
+
+    return string
+
+
+class Task:
+    """A taskable peer task.
+
+    On the wire a task is a fixed header followed by its sender, priority and todo
+    strings and a JSON body holding the payload and results (if any).
+    """
+
+    __slots__ = (
+        "id",
+        "time",
+        "sender",
+        "priority",
+        "todo",
+        "status",
+        "payload",
+        "results",
+    )
+
+    # id, time, status, len(sender), len(priority), len(todo), len(body)
+    HEADER = struct.Struct("<16sdBHHHI")
+
+    def __init__(
+        self,
+        sender: str,
+        todo: str | None = None,
+        payload: dict[str, Any] | None = None,
+        priority: str | None = None,
+        status: TaskStatus = TaskStatus.NEW,
+        results: Any = None,
+        id: bytes | None = None,
+        time: float | None = None,
+    ):
+        self.id = id if id is not None else uuid.uuid4().bytes
+        self.time = time if time is not None else _now()
+        self.sender = sys.intern(sender)
+        self.priority = sys.intern(priority) if priority is not None else None
+        self.todo = todo
+        self.status = status
+        self.payload = payload if payload is not None else {}
+        self.results = results
+
+    @property
+    def finished(self) -> bool:
+        return self.status >= TaskStatus.COMPLETE
+
+    def encode(self) -> bytes:
+        sender = self.sender.encode()
+        priority = self.priority.encode() if self.priority is not None else b""
+        todo = self.todo.encode() if self.todo is not None else b""
+        body = b""
+        if self.payload or self.results is not None:
+            body = json.dumps([self.payload, self.results]).encode()
+
+        return (
+            self.HEADER.pack(
+                self.id,
+                self.time,
+                self.status,
+                len(sender),
+                len(priority),
+                len(todo),
+                len(body),
+            )
+            + sender
+            + priority
+            + todo
+            + body
+        )
+
+    @classmethod
+    def decode_from(cls, data: bytes, offset=0) -> tuple["Task", int]:
+        """Decode the task at `offset`, returning it and the offset past it"""
+        (
+            id,
+            time,
+            status,
+            n_sender,
+            n_priority,
+            n_todo,
+            n_body,
+        ) = cls.HEADER.unpack_from(data, offset)
+        offset += cls.HEADER.size
+
+        task = cls.__new__(cls)
+        task.id = id
+        task.time = time
+        task.status = _statuses[status]
+        task.sender = _intern(data[offset : offset + n_sender])
+        offset += n_sender
+        task.priority = _intern(data[offset : offset + n_priority])
+        offset += n_priority
+        task.todo = _intern(data[offset : offset + n_todo])
+        offset += n_todo
+
+        if n_body:
+            task.payload, task.results = json.loads(data[offset : offset + n_body])
+        else:
+            task.payload, task.results = {}, None
+        offset += n_body
+
+        return task, offset
+
+    @classmethod
+    def decode(cls, data: bytes) -> "Task":
+        return cls.decode_from(data)[0]
+
+    @staticmethod
+    def encode_batch(tasks: list["Task"]) -> bytes:
+        return b"".join(task.encode() for task in tasks)
+
+    @classmethod
+    def decode_batch(cls, data: bytes) -> list["Task"]:
+        tasks, offset = [], 0
+        while offset < len(data):
+            task, offset = cls.decode_from(data, offset)
+            tasks.append(task)
+
+        return tasks
+
+    def to_record(self) -> list:
+        """A JSON-serializable form of the task, e.g. for a Journal"""
+        return [
+            self.id.hex(),
+            self.time,
+            self.sender,
+            self.priority,
+            self.todo,
+            int(self.status),
+            self.payload,
+            self.results,
+        ]
+
+    @classmethod
+    def from_record(cls, record: list) -> "Task":
+        id, time, sender, priority, todo, status, payload, results = record
+        return cls(
+            sender,
+            todo,
+            payload,
+            priority,
+            TaskStatus(status),
+            results,
+            bytes.fromhex(id),
+            time,
+        )
+
+    def __repr__(self):
+        return (
+            f"<Task {self.id.hex()} {self.todo} {self.status.name}"
+            f" {self.sender} -> {self.priority}>"
+        )
+
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from pathlib import Path
+import struct
+import time
+from typing import Iterable, Iterator, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# A trace is MAGIC and the tracing peer's address (ADDRESS length prefixed),
+# followed by records: a RECORD header and then the raw packet.
+MAGIC = b"ZMQTRACE\x01"
+ADDRESS = struct.Struct("<H")
+
+RECV = 0
+SEND = 1
+# Or'd into the direction of packets that went over the direct channel.
+DIRECT = 2
+
+# time, direction, packet length
+RECORD = struct.Struct("<dBI")
+
+
+class TraceRecord(NamedTuple):
+    time: float
+    direction: int
+    packet: bytes
+
+
+class TraceWriter:
+    """Appends every packet a peer sends or receives to a binary trace file"""
+
+    def __init__(self, path, address: str, buffer_size=1 << 20):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "wb", buffering=buffer_size)
+
+        address = address.encode()
+        self._file.write(MAGIC + ADDRESS.pack(len(address)) + address)
+
+    def write(self, direction: int, packet: bytes):
+        self._file.write(RECORD.pack(time.time(), direction, len(packet)))
+        self._file.write(packet)
+
+    def close(self):
+        self._file.close()
+
+
+class TraceReader:
+    """A trace file, iterating over it yields its records"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self.address = self._read_header(f)
+
+    def _read_header(self, f) -> str:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{self.path} is not a zmqer trace")
+
+        (length,) = ADDRESS.unpack(f.read(ADDRESS.size))
+        return f.read(length).decode()
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        """Iterate over the records, stopping at a torn tail if there is one"""
+        with open(self.path, "rb") as f:
+            self._read_header(f)
+            while header := f.read(RECORD.size):
+                if len(header) < RECORD.size:
+                    break
+
+                timestamp, direction, length = RECORD.unpack(header)
+                packet = f.read(length)
+                if len(packet) < length:
+                    break
+
+                yield TraceRecord(timestamp, direction, packet)
+
+
+async def replay(
+    records: Iterable[TraceRecord], peers: list, speed: float | None = 1.0
+) -> int:
+    """Feed the received packets of a trace into every peer's message handler.
+
+    Packets are spaced as they were recorded, `speed` times faster, or sent back
+    to back if `speed` is None. Returns the number of packets replayed.
+    """
+    loop = asyncio.get_running_loop()
+    start = first = None
+    count = 0
+    for record in records:
+        if record.direction & SEND:
+            continue
+
+        if speed is not None:
+            if first is None:
+                start, first = loop.time(), record.time
+            delay = start + (record.time - first) / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif count % 100 == 0:
+            # Let the peers' own loops run between bursts.
+            await asyncio.sleep(0)
+
+        for peer in peers:
+            try:
+                await peer.message_type_handler(record.packet)
+            except Exception as e:
+                logger.error("Error replaying packet into %s: %s", peer, e)
+
+        count += 1
+
+    return count